@@ -0,0 +1,596 @@
+import argparse
+import json
+import random
+import sys
+import time
+import timeit
+
+import chess
+import numpy as np
+from chess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+from .bot import make_bot
+from .scorers import SimpleScorer, ComplexScorer, BitboardComplexScorer
+from .incremental import IncrementalSimpleScorer, IncrementalComplexScorer
+from .minimaxers import RegularMinimaxer, PriorityMinimaxer, AlphaBetaMinimaxer, SelectiveMinimaxer
+from .general_bot import SimpleBot
+from .victor import ChessBotVictor, ChessBotMonteCarlo
+from .victor import PAWNS_EVAL, KNIGHTS_EVAL, BISHOPS_EVAL, ROOKS_EVAL, QUEEN_EVAL, KING_EVAL, KING_END_GAME_EVAL
+from .parallel import ParallelBot
+
+POSITIONS = [
+    'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3',
+    'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QKB1R w KQ - 0 8',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+]
+
+# (category, fen, best move or None) for the full suite
+SUITE = [
+    ('opening', POSITIONS[0], None),
+    ('opening', POSITIONS[1], None),
+    ('middlegame', POSITIONS[2], None),
+    ('middlegame', 'r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7', None),
+    ('tactical', 'rnb1kbnr/ppp2ppp/8/3qp3/8/2N5/PPPP1PPP/R1BQKBNR w KQkq - 0 4', 'c3d5'),
+    ('tactical', '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'a1a8'),
+    ('tactical', 'r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4', 'h5f7'),
+    ('tactical', '8/4k3/8/q7/3N4/8/5PPP/6K1 w - - 0 1', 'd4c6'),
+    ('tactical', '8/1q6/8/3k4/8/8/5PPP/3B2K1 w - - 0 1', 'd1f3'),
+    ('endgame', POSITIONS[3], None),
+    ('endgame', '8/8/8/4k3/8/8/8/R3K3 w - - 0 1', None),
+    ('endgame', '8/5k2/8/8/8/8/3PK3/8 w - - 0 1', None),
+]
+
+# searches of the full suite; depths are run in turn for time-to-depth, the last one
+# gives nodes, moves and agreement. MCTS has no depth and runs once.
+SEARCH_SPECS = {
+    'regular': ((SimpleBot, ('Regular', BitboardComplexScorer, RegularMinimaxer, 2)), (1, 2)),
+    'priority': ((SimpleBot, ('Priority', BitboardComplexScorer, PriorityMinimaxer, 3, 5, 3)), (1, 2, 3)),
+    'alphabeta': ((SimpleBot, ('AlphaBeta', BitboardComplexScorer, AlphaBetaMinimaxer, 3, 2)), (1, 2, 3)),
+    'selective': ((SimpleBot, ('Selective', BitboardComplexScorer, SelectiveMinimaxer, 3, 2)), (1, 2, 3)),
+    'victor': ((ChessBotVictor, ('Victor', {'depth': 2})), (1, 2, 3)),
+    'mcts': ((ChessBotMonteCarlo, ('MCTS', {'n_simulations': 2, 'n_iterations': 50})), (None,)),
+}
+
+BOT_SPECS = {
+    'alphabeta': (SimpleBot, ('AlphaBeta', BitboardComplexScorer, AlphaBetaMinimaxer, 3)),
+    'victor': (ChessBotVictor, ('Victor', {'depth': 2})),
+}
+
+def random_positions(count, seed=0, max_plies=160):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(1, max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            boards.append(board.copy(stack=False))
+    return boards[:count]
+
+class BaselineComplexScorer(ComplexScorer):
+    # ComplexScorer as it was before it was optimised, frozen here so the
+    # scorer suite keeps measuring speedups against the same reference
+    def scorer(self, board): # WHITE maximizes, BLACK minimizes
+        if board.is_game_over():
+            return {"1-0": 100000, "1/2-1/2": 0, "0-1": -100000}[board.result()]
+
+        res = 0
+        scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN:9, KING:10}
+        color_factors = {WHITE: 1, BLACK: -1}
+
+        score_board = [[0]*8 for _ in range(8)]
+        attackers_count = [[0] * 64 for _ in range(2)]
+        weakest_attacker = [[12] * 64 for _ in range(2)]
+
+        for square in range(64):
+            piece = board.piece_at(square)
+            if piece:
+                piece_score = scores[piece.piece_type]
+                targets = board.attacks(square)
+                for target in targets:
+                    attackers_count[int(piece.color)][target] += 1
+                    if piece_score < weakest_attacker[int(piece.color)][target]:
+                        weakest_attacker[int(piece.color)][target] = piece_score
+
+        for square in range(64):
+            piece = board.piece_at(square)
+
+            if piece:
+                piece_score = 100 * scores[piece.piece_type]
+                num_atk = attackers_count[not piece.color][square]
+                num_def = attackers_count[piece.color][square]
+
+                to_move = board.turn == chess.WHITE if piece.color == chess.WHITE \
+                    else board.turn == chess.BLACK
+
+                # penalty for attackers
+                if num_atk > 0:
+                    if num_def > 0: # if there are defenders, penalize for weakest attacker
+                        piece_score -= max(0, 50 * (scores[piece.piece_type] - weakest_attacker[not piece.color][square]))
+                    else: #penalty if there is any attacker
+                        piece_score -= 50 * scores[piece.piece_type]
+
+                #bonux for defenders
+                enough_defenders = num_atk - 1 if to_move else num_atk
+                if num_def >= enough_defenders: piece_score += 10 * scores[piece.piece_type]
+
+                score_board[square//8][square%8] = piece_score * color_factors[piece.color]
+                res += piece_score * color_factors[piece.color]
+            else: # empty square, compute territory bonuses
+                square_worth = self.square_scores[square]
+                if attackers_count[int(chess.WHITE)][square] > attackers_count[int(chess.BLACK)][square]:
+                    res += square_worth
+                    score_board[square//8][square%8] = square_worth
+                elif attackers_count[int(chess.WHITE)][square] < attackers_count[int(chess.BLACK)][square]:
+                    res -= square_worth
+                    score_board[square//8][square%8] = -square_worth
+
+        return res
+
+class BaselineVictor(ChessBotVictor):
+    # ChessBotVictor's evaluation as it was before it was optimised, frozen
+    # here as the reference of the victor suite
+    pawns_eval_white = PAWNS_EVAL
+    pawns_eval_black = PAWNS_EVAL[::-1]
+    knights_eval_white = KNIGHTS_EVAL
+    knights_eval_black = KNIGHTS_EVAL[::-1]
+    bishops_eval_white = BISHOPS_EVAL
+    bishops_eval_black = BISHOPS_EVAL[::-1]
+    rooks_eval_white = ROOKS_EVAL
+    rooks_eval_black = ROOKS_EVAL[::-1]
+    queen_eval_white = QUEEN_EVAL
+    queen_eval_black = QUEEN_EVAL[::-1]
+    king_eval_white = KING_EVAL
+    king_eval_black = KING_EVAL[::-1]
+    king_end_game_eval_white = KING_END_GAME_EVAL
+    king_end_game_eval_black = KING_END_GAME_EVAL[::-1]
+
+    def new_search(self, board):
+        super().new_search(board)
+        self.start_board = board.copy()
+
+    def is_end_game(self, board):
+        n_pawns = len(board.pieces(chess.PAWN, True)) + len(board.pieces(chess.PAWN, False))
+        n_knights = len(board.pieces(chess.KNIGHT, True)) + len(board.pieces(chess.KNIGHT, False))
+        n_bishops = len(board.pieces(chess.BISHOP, True)) + len(board.pieces(chess.BISHOP, False))
+        n_rooks = len(board.pieces(chess.ROOK, True)) + len(board.pieces(chess.ROOK, False))
+        n_queens = len(board.pieces(chess.QUEEN, True)) + len(board.pieces(chess.QUEEN, False))
+        n_kings = len(board.pieces(chess.KING, True)) + len(board.pieces(chess.KING, False))
+
+        if n_pawns + n_knights + n_bishops + n_rooks + n_queens + n_kings <= 22:
+            return True
+        else:
+            return False
+
+    def calc_heuristic_score(self, board, depth):
+        score = 0
+
+        for i in range(8*8):
+            piece = board.piece_at(i)
+            if not piece:
+                continue
+
+            if piece.color == self.is_white:
+                if piece.piece_type == chess.PAWN:
+                    if self.is_white:
+                        score += self.pawns_eval_white[i]
+                    else:
+                        score += self.pawns_eval_black[i]
+
+                elif piece.piece_type == chess.KNIGHT:
+                    if self.is_white:
+                        score += self.knights_eval_white[i]
+                    else:
+                        score += self.knights_eval_black[i]
+
+                elif piece.piece_type == chess.BISHOP:
+                    if self.is_white:
+                        score += self.bishops_eval_white[i]
+                    else:
+                        score += self.bishops_eval_black[i]
+
+                elif piece.piece_type == chess.ROOK:
+                    if self.is_white:
+                        score += self.rooks_eval_white[i]
+                    else:
+                        score += self.rooks_eval_black[i]
+
+                elif piece.piece_type == chess.QUEEN:
+                    if self.is_white:
+                        score += self.queen_eval_white[i]
+                    else:
+                        score += self.queen_eval_black[i]
+
+                elif piece.piece_type == chess.KING and self.is_end_game(board):
+                    if self.is_white:
+                        score += self.king_end_game_eval_white[i]
+                    else:
+                        score += self.king_end_game_eval_black[i]
+
+                elif piece.piece_type == chess.KING:
+                    if self.is_white:
+                        score += self.king_eval_white[i]
+                    else:
+                        score += self.king_eval_black[i]
+
+                else:
+                    pass
+
+            else:
+                if piece.piece_type == chess.PAWN:
+                    if not self.is_white:
+                        score -= self.pawns_eval_white[i]
+                    else:
+                        score -= self.pawns_eval_black[i]
+
+                elif piece.piece_type == chess.KNIGHT:
+                    if not self.is_white:
+                        score -= self.knights_eval_white[i]
+                    else:
+                        score -= self.knights_eval_black[i]
+
+                elif piece.piece_type == chess.BISHOP:
+                    if not self.is_white:
+                        score -= self.bishops_eval_white[i]
+                    else:
+                        score -= self.bishops_eval_black[i]
+
+                elif piece.piece_type == chess.ROOK:
+                    if not self.is_white:
+                        score -= self.rooks_eval_white[i]
+                    else:
+                        score -= self.rooks_eval_black[i]
+
+                elif piece.piece_type == chess.QUEEN:
+                    if not self.is_white:
+                        score -= self.queen_eval_white[i]
+                    else:
+                        score -= self.queen_eval_black[i]
+
+                elif piece.piece_type == chess.KING and self.is_end_game(board):
+                    if not self.is_white:
+                        score -= self.king_end_game_eval_white[i]
+                    else:
+                        score -= self.king_end_game_eval_black[i]
+
+                elif piece.piece_type == chess.KING:
+                    if not self.is_white:
+                        score -= self.king_eval_white[i]
+                    else:
+                        score -= self.king_eval_black[i]
+
+                else:
+                    pass
+
+        # Opponent looses King
+        if board.is_checkmate() and (not self.is_white == board.turn):
+            score += 9000
+
+        # Bot looses King
+        if board.is_checkmate() and (self.is_white == board.turn):
+            score += -9000
+
+        # Opponent looses Queen
+        if len(self.start_board.pieces(chess.QUEEN, (not self.is_white))) > len(board.pieces(chess.QUEEN, (not self.is_white))):
+            score += 900
+
+        # Bot looses Queen
+        if len(self.start_board.pieces(chess.QUEEN, self.is_white)) > len(board.pieces(chess.QUEEN, self.is_white)):
+            score += -900
+
+        # Opponent looses Rook
+        if len(self.start_board.pieces(chess.ROOK, (not self.is_white))) > len(board.pieces(chess.ROOK, (not self.is_white))):
+            score += 500
+
+        # Bot looses Rook
+        if len(self.start_board.pieces(chess.ROOK, self.is_white)) > len(board.pieces(chess.ROOK, self.is_white)):
+            score += -500
+
+        # Opponent looses Bishop
+        if len(self.start_board.pieces(chess.BISHOP, (not self.is_white))) > len(board.pieces(chess.BISHOP, (not self.is_white))):
+            score += 300
+
+        # Bot looses Bishop
+        if len(self.start_board.pieces(chess.BISHOP, self.is_white)) > len(board.pieces(chess.BISHOP, self.is_white)):
+            score += -300
+
+        # Opponent looses Knight
+        if len(self.start_board.pieces(chess.KNIGHT, (not self.is_white))) > len(board.pieces(chess.KNIGHT, (not self.is_white))):
+            score += 300
+
+        # Bot looses Knight
+        if len(self.start_board.pieces(chess.KNIGHT, self.is_white)) > len(board.pieces(chess.KNIGHT, self.is_white)):
+            score += -300
+
+        # Opponent looses Pawn
+        if len(self.start_board.pieces(chess.PAWN, (not self.is_white))) > len(board.pieces(chess.PAWN, (not self.is_white))):
+            score += 100
+
+        # Bot looses Pawn
+        if len(self.start_board.pieces(chess.PAWN, self.is_white)) > len(board.pieces(chess.PAWN, self.is_white)):
+            score += -100
+
+        # Makes AI smarter with weighting depth (number of moves)
+        score += (depth-1) * 100
+        return score
+
+class VictorScorer:
+    # Victor's heuristic behind the scorer interface, from WHITE's side with
+    # the start position as its root
+    def __init__(self):
+        self.bot = ChessBotVictor('Victor', {'depth': 1})
+        self.bot.new_search(chess.Board())
+
+    def scorer(self, board):
+        return self.bot.calc_heuristic_score(board, 1)
+
+def evals_per_second(scorer, boards, repeat=3):
+    best = min(timeit.repeat(lambda: [scorer.scorer(board) for board in boards], number=1, repeat=repeat))
+    return len(boards) / best
+
+def agreement(reference, scorer, boards):
+    return sum(reference.scorer(board) == scorer.scorer(board) for board in boards) / len(boards)
+
+def bench_scorers(scorers, boards, reference=None):
+    rows = []
+    base_speed = None
+    for scorer in scorers:
+        speed = evals_per_second(scorer, boards)
+        base_speed = base_speed or speed
+        rows.append({
+            'scorer': type(scorer).__name__,
+            'evals_per_sec': speed,
+            'speedup': speed / base_speed,
+            'agreement': agreement(reference, scorer, boards) if reference is not None else None,
+        })
+    return rows
+
+def walk(scorer, board, depth, visit):
+    # every node of a full-width search tree, moved through the scorer's push/pop
+    # as a search would, so incremental scorers keep their state up to date
+    visit(board)
+    if depth:
+        for move in list(board.generate_legal_moves()):
+            scorer.push(board, move)
+            walk(scorer, board, depth - 1, visit)
+            scorer.pop(board)
+
+def bench_walks(pairs, boards, depth=2):
+    # (reference, scorer) pairs scored at every node of walks from the boards;
+    # each scorer is timed and checked against its reference
+    rows = []
+    for reference, scorer in pairs:
+        scores, speeds = [], []
+        for player in (reference, scorer):
+            player_scores = []
+            start = time.perf_counter()
+            for board in boards:
+                walk(player, board.copy(), depth, lambda board: player_scores.append(player.scorer(board)))
+            speeds.append(len(player_scores) / (time.perf_counter() - start))
+            scores.append(player_scores)
+        agree = sum(a == b for a, b in zip(*scores)) / len(scores[0])
+        rows.append({'scorer': type(reference).__name__, 'evals_per_sec': speeds[0], 'speedup': 1.0, 'agreement': None})
+        rows.append({'scorer': type(scorer).__name__, 'evals_per_sec': speeds[1], 'speedup': speeds[1] / speeds[0],
+                     'agreement': agree})
+    return rows
+
+def print_rows(rows):
+    print("{:<24}{:>14}{:>10}{:>11}".format("scorer", "evals/sec", "speedup", "agreement"))
+    for row in rows:
+        agree = "-" if row['agreement'] is None else "{:.1%}".format(row['agreement'])
+        print("{:<24}{:>14.0f}{:>9.2f}x{:>11}".format(row['scorer'], row['evals_per_sec'], row['speedup'], agree))
+
+def seed_all(seed):
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+def bench_search(name, bot_spec, depths, suite, seed=0):
+    time_to_depth = {}
+    for depth in depths:
+        bot = make_bot(bot_spec)
+        if depth is not None:
+            bot.depth = depth
+        moves, nodes, elapsed = [], 0, 0.0
+        for index, (category, fen, best) in enumerate(suite):
+            seed_all(seed + index)
+            move = bot.move(chess.Board(fen))
+            stats = bot.last_search_stats
+            moves.append(move.uci() if move is not None else None)
+            nodes += stats.get_nodes()
+            elapsed += stats.elapsed
+        time_to_depth[str(depth)] = elapsed
+        if hasattr(bot, 'close'):
+            bot.close()
+
+    tactics = [(move, best) for move, (_, _, best) in zip(moves, suite) if best is not None]
+    return {
+        'search': name,
+        'depth': depths[-1],
+        'nodes_per_sec': nodes / elapsed if elapsed else 0.0,
+        'nodes': nodes,
+        'time_to_depth': time_to_depth,
+        'agreement': sum(move == best for move, best in tactics) / len(tactics) if tactics else None,
+        'moves': moves,
+    }
+
+def bench_searches(names, suite, seed=0):
+    return [bench_search(name, SEARCH_SPECS[name][0], SEARCH_SPECS[name][1], suite, seed) for name in names]
+
+def print_search_rows(rows):
+    print("{:<12}{:>7}{:>12}{:>10}{:>11}  {}".format("search", "depth", "nodes/sec", "nodes", "agreement", "seconds to depth"))
+    for row in rows:
+        agree = "-" if row['agreement'] is None else "{:.0%}".format(row['agreement'])
+        depths = ' '.join("{}:{:.2f}".format(depth, seconds) for depth, seconds in row['time_to_depth'].items())
+        print("{:<12}{:>7}{:>12.0f}{:>10}{:>11}  {}".format(row['search'], str(row['depth']), row['nodes_per_sec'],
+                                                          row['nodes'], agree, depths))
+
+def run_suite(positions=2000, seed=0, searches=None):
+    boards = random_positions(positions, seed)
+    scorers = [SimpleScorer(), ComplexScorer(), BitboardComplexScorer(), VictorScorer()]
+    return {
+        'seed': seed,
+        'positions': positions,
+        'scorers': bench_scorers(scorers, boards),
+        'searches': bench_searches(searches or sorted(SEARCH_SPECS), SUITE, seed),
+    }
+
+def compare(results, baseline, tolerance=0.2, min_seconds=0.1):
+    # (report lines, number of slowdowns beyond tolerance); rates should not
+    # drop and times should not grow. Times under min_seconds are too noisy to
+    # compare. Changed moves are reported, not counted.
+    lines, slowdowns = [], 0
+
+    def check(label, current, before, higher_is_better):
+        nonlocal slowdowns
+        if not before:
+            return
+        ratio = current / before
+        slower = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        slowdowns += slower
+        lines.append("{:<40}{:>12.4g}{:>12.4g}{:>8.2f}x{}".format(label, before, current, ratio,
+                                                                 "  SLOWER" if slower else ""))
+
+    before = {row['scorer']: row for row in baseline.get('scorers', [])}
+    for row in results['scorers']:
+        if row['scorer'] in before:
+            check(row['scorer'] + ' evals/sec', row['evals_per_sec'], before[row['scorer']]['evals_per_sec'], True)
+
+    before = {row['search']: row for row in baseline.get('searches', [])}
+    for row in results['searches']:
+        old = before.get(row['search'])
+        if old is None:
+            continue
+        check(row['search'] + ' nodes/sec', row['nodes_per_sec'], old['nodes_per_sec'], True)
+        for depth, seconds in row['time_to_depth'].items():
+            if old['time_to_depth'].get(depth, 0) >= min_seconds:
+                check("{} seconds to depth {}".format(row['search'], depth), seconds, old['time_to_depth'][depth], False)
+        changed = sum(a != b for a, b in zip(row['moves'], old['moves']))
+        if changed:
+            lines.append("{}: {} of {} moves differ from the baseline".format(row['search'], changed, len(row['moves'])))
+    return lines, slowdowns
+
+def bench_parallel(bot_spec, boards, workers=(1, 2, 4, 8), seed=0):
+    rows = []
+    base_time = None
+    for n_workers in workers:
+        bot = ParallelBot('Parallel', bot_spec, n_workers, seed)
+        bot.move(chess.Board()) # start the worker processes outside the timing
+        start = time.perf_counter()
+        moves = [bot.move(board) for board in boards]
+        elapsed = time.perf_counter() - start
+        bot.close()
+
+        base_time = base_time or elapsed
+        rows.append({
+            'workers': n_workers,
+            'seconds': elapsed,
+            'speedup': base_time / elapsed,
+            'moves': ' '.join(move.uci() for move in moves),
+        })
+    return rows
+
+def print_parallel_rows(rows):
+    print("{:<10}{:>10}{:>10}  {}".format("workers", "seconds", "speedup", "moves"))
+    for row in rows:
+        print("{:<10}{:>10.2f}{:>9.2f}x  {}".format(row['workers'], row['seconds'], row['speedup'], row['moves']))
+
+def victor_leaves(boards, depth=2):
+    # (root, leaf, depth) for every leaf scored by Victor searches from the boards, in search order
+    leaves = []
+    bot = ChessBotVictor('Victor', {'depth': depth})
+    evaluate = bot.calc_heuristic_score
+    for root in boards:
+        bot.calc_heuristic_score = lambda board, d: leaves.append((root, board.copy(stack=False), d)) or evaluate(board, d)
+        bot.move(root.copy())
+    return leaves
+
+def bench_victor(leaves, repeat=5):
+    # the leaves in search order, so the piece scores cached per search hit as
+    # they do in a real search, and once more with those caches emptied per leaf
+    def run(bot, cached=True):
+        scores = []
+        last = None
+        for root, board, depth in leaves:
+            if root is not last:
+                bot.new_search(root)
+                last = root
+            if not cached:
+                bot.piece_scores = [{} for _ in range(7)]
+            scores.append(bot.calc_heuristic_score(board, depth))
+        return scores
+
+    rows = []
+    baseline = BaselineVictor('Baseline', {'depth': 2})
+    reference = run(baseline)
+    base_speed = None
+    for name, bot, cached in (('BaselineVictor', baseline, True), ('ChessBotVictor', ChessBotVictor('Victor', {'depth': 2}), True),
+                              ('ChessBotVictor uncached', ChessBotVictor('Victor', {'depth': 2}), False)):
+        best = min(timeit.repeat(lambda: run(bot, cached), number=1, repeat=repeat))
+        speed = len(leaves) / best
+        base_speed = base_speed or speed
+        scores = run(bot, cached)
+        rows.append({
+            'scorer': name,
+            'evals_per_sec': speed,
+            'speedup': speed / base_speed,
+            'agreement': sum(a == b for a, b in zip(reference, scores)) / len(leaves),
+        })
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chessbot scorers and searches")
+    parser.add_argument('--suite', choices=['scorers', 'parallel', 'victor', 'full'], default='scorers')
+    parser.add_argument('--positions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--walks', type=int, default=20, help='positions to walk incremental scorers from')
+    parser.add_argument('--bot', choices=sorted(BOT_SPECS), default='alphabeta')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--searches', nargs='+', choices=sorted(SEARCH_SPECS), help='full suite searches to run')
+    parser.add_argument('--save-baseline', help='write the full suite results to this JSON file')
+    parser.add_argument('--baseline', help='compare the full suite with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    if args.suite == 'full':
+        results = run_suite(args.positions, args.seed, args.searches)
+        print_rows(results['scorers'])
+        print()
+        print_search_rows(results['searches'])
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as f:
+                json.dump(results, f, indent=1)
+        if args.baseline:
+            with open(args.baseline) as f:
+                lines, slowdowns = compare(results, json.load(f), args.tolerance)
+            print()
+            print("{:<40}{:>12}{:>12}{:>9}".format("baseline", "before", "now", "ratio"))
+            print('\n'.join(lines))
+            if slowdowns:
+                sys.exit(1)
+        return
+
+    if args.suite == 'scorers':
+        boards = random_positions(args.positions, args.seed)
+        rows = bench_scorers([BaselineComplexScorer(), ComplexScorer(), BitboardComplexScorer()], boards,
+                             reference=BaselineComplexScorer())
+        print_rows(rows)
+        print()
+        walks = bench_walks([(SimpleScorer(), IncrementalSimpleScorer()), (ComplexScorer(), IncrementalComplexScorer())],
+                            boards[:args.walks])
+        print_rows(walks)
+        if any(row['agreement'] is not None and row['agreement'] < 1 for row in rows + walks):
+            sys.exit(1)
+    elif args.suite == 'victor':
+        rows = bench_victor(victor_leaves([chess.Board(fen) for category, fen, best in SUITE]))
+        print_rows(rows)
+        if any(row['agreement'] < 1 for row in rows):
+            sys.exit(1)
+    else:
+        boards = [chess.Board(fen) for fen in POSITIONS]
+        print_parallel_rows(bench_parallel(BOT_SPECS[args.bot], boards, args.workers, args.seed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import random
+
+import chess
+import chess.polyglot
+
+from .bot import ChessBot, make_bot
+
+class BookBot(ChessBot):
+    # Plays from a Polyglot opening book while it has an entry for the position
+    # and falls through to the wrapped bot's move() otherwise. chess.polyglot
+    # memory-maps the file and binary searches it by Zobrist key. The reader is
+    # opened on first use in each process, so tournament workers share the
+    # file's pages instead of loading their own copy.
+    # selection is 'weighted' (random, in proportion to the entry weights) or 'best'.
+    def __init__(self, name, bot_spec, book_path, selection='weighted', seed=None):
+        super().__init__(name)
+        assert selection in ('weighted', 'best')
+        self.bot = make_bot(bot_spec)
+        self.book_path = book_path
+        self.selection = selection
+        self.rng = random.Random(seed) if seed is not None else None # None: the global random
+        self.reader = None
+        self.from_book = False
+        self.reset_counters()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['reader'] = None
+        return state
+
+    def reset_counters(self):
+        self.book_moves = 0
+        self.search_moves = 0
+
+    def get_book_moves(self):
+        return self.book_moves
+
+    def get_search_moves(self):
+        return self.search_moves
+
+    def get_reader(self):
+        if self.reader is None:
+            self.reader = chess.polyglot.open_reader(self.book_path)
+        return self.reader
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if hasattr(self.bot, 'close'):
+            self.bot.close()
+
+    def book_move(self, board):
+        reader = self.get_reader()
+        if self.selection == 'best':
+            entry = reader.get(board)
+        else:
+            try:
+                entry = reader.weighted_choice(board, random=self.rng)
+            except IndexError:
+                entry = None
+        return entry.move if entry is not None else None
+
+    def collect_stats(self, stats):
+        # a move out of the book carries the wrapped bot's search
+        if not self.from_book:
+            stats.add(self.bot.last_search_stats)
+
+    def move(self, board):
+        move = self.book_move(board)
+        self.from_book = move is not None
+        if move is not None:
+            self.book_moves += 1
+            return move
+        self.search_moves += 1
+        self.bot.deadline = self.deadline
+        try:
+            return self.bot.move(board)
+        finally:
+            self.bot.deadline = None
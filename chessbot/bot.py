@@ -1,19 +1,101 @@
 import abc
+import functools
+import importlib
+import time
 import numpy as np
 import random as rnd
 
+from .stats import SearchStats, run_profiled, save_profile
+
+def make_bot(spec):
+    # spec is (class, args): the class or its dotted path, and the constructor arguments
+    cls, args = spec
+    if isinstance(cls, str):
+        module, _, name = cls.rpartition('.')
+        cls = getattr(importlib.import_module(module), name)
+    return cls(*args)
+
+class SearchTimeout(Exception):
+    pass
+
+# perf_counter() only compares within a process; deadlines cross to worker
+# processes as time.time() and are turned back on arrival
+def wall_deadline(deadline):
+    return None if deadline is None else time.time() + deadline - time.perf_counter()
+
+def local_deadline(deadline):
+    return None if deadline is None else time.perf_counter() + deadline - time.time()
+
+def record_search(move):
+    # times a move() and leaves its SearchStats in bot.last_search_stats; a
+    # move() called from inside another one (super().move) is not recorded twice
+    @functools.wraps(move)
+    def recorded_move(self, board):
+        if self.stats is not None:
+            return move(self, board)
+
+        ply = len(board.move_stack)
+        stats = self.stats = SearchStats(self.get_name(), ply)
+        profiler = None
+        start = time.perf_counter()
+        try:
+            if ply in self.profile_plies:
+                result, profiler = run_profiled(move, self, board)
+            else:
+                result = move(self, board)
+        finally:
+            self.stats = None
+
+        stats.elapsed = time.perf_counter() - start
+        stats.move = result.uci() if result is not None else None
+        self.collect_stats(stats)
+        if profiler is not None:
+            stats.profile = save_profile(profiler, self.profile_dir, "{}-{}".format(self.name, ply))
+        self.last_search_stats = stats
+        return result
+    return recorded_move
+
 class ChessBot:
+    stats = None # the SearchStats of the move in progress
+    last_search_stats = None
+    # moves at these plies (len(board.move_stack)) run under cProfile, the
+    # report or the .prof file in profile_dir ends up in stats.profile
+    profile_plies = ()
+    profile_dir = None
+    shuffle_moves = True # random tie-breaking between equal moves
+    # time.perf_counter() by which move() has to return, set by whoever keeps
+    # the clock; searches call check_time() and give up with SearchTimeout
+    deadline = None
+
     def __init__(self, name, opt_dict = None):
         self.name = name
         pass
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'move' in cls.__dict__:
+            cls.move = record_search(cls.__dict__['move'])
+
     @abc.abstractmethod
     def move(self, board):
         pass
-    
+
+    def collect_stats(self, stats):
+        # bots with counters of their own copy them in here after move()
+        pass
+
+    def check_time(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
     def possible_moves(self, board):
+        stats = self.stats
+        start = time.perf_counter() if stats is not None else 0.0
         moves = list(board.legal_moves)
-        rnd.shuffle(moves)
+        if self.shuffle_moves:
+            rnd.shuffle(moves)
+        if stats is not None:
+            stats.add_movegen(len(moves), time.perf_counter() - start)
         return moves
     
     def get_name(self):
@@ -1,6 +1,8 @@
 from .bot import ChessBot
+from .quiescence import Quiescence
 
 import chess
+import time
 from chess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
 
 class ChessBotOK(ChessBot):
@@ -8,9 +10,33 @@ class ChessBotOK(ChessBot):
     def __init__(self, name, opt_dict = None):
         super().__init__(name, opt_dict)
         self.depth = opt_dict['depth']
+        q_depth = opt_dict.get('q_depth', 0)
+        self.quiescence = Quiescence(self.score, q_depth, check_time=self.check_time) if q_depth else None
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.total_scorings = 0
+        self.scoring_time = 0.0
+        self.nodes = 0
+        if self.quiescence is not None:
+            self.quiescence.reset_counters()
+
+    def collect_stats(self, stats):
+        q_nodes = self.quiescence.get_nodes() if self.quiescence is not None else 0
+        stats.nodes += self.nodes + q_nodes
+        stats.q_nodes += q_nodes
+        stats.leaf_evals += self.total_scorings
+        stats.eval_time += self.scoring_time
+        stats.max_depth = self.depth
 
     def score(self, board): # WHITE maximizes, BLACK minimizes
         self.total_scorings += 1
+        start = time.perf_counter()
+        res = self.evaluate(board)
+        self.scoring_time += time.perf_counter() - start
+        return res
+
+    def evaluate(self, board):
         if board.is_game_over():
             return {"1-0": 10000, "1/2-1/2": 0, "0-1": -10000}[board.result()]
 
@@ -25,6 +51,11 @@ class ChessBotOK(ChessBot):
         return res
 
     def minimax(self, board, depth):
+        self.nodes += 1
+        self.check_time()
+        if depth == 0 and self.quiescence is not None:
+            color = 1 if board.turn == WHITE else -1
+            return (color * self.quiescence.search(board, -100000, 100000), None)
         if depth == 0 or board.is_game_over():
             return (self.score(board), None)
 
@@ -32,9 +63,6 @@ class ChessBotOK(ChessBot):
             best_score = -100000
             best_move = None
 
-            selected_moves = self.possible_moves(board)
-            print(len(selected_moves))
-
             for move in self.possible_moves(board):
                 board.push(move)
                 move_score, _ = self.minimax(board, depth - 1)
@@ -49,9 +77,6 @@ class ChessBotOK(ChessBot):
             best_score = 100000
             best_move = None
 
-            selected_moves = self.possible_moves(board)
-            print(len(selected_moves))
-
             for move in self.possible_moves(board):
                 board.push(move)
                 move_score, _ = self.minimax(board, depth - 1)
@@ -63,6 +88,7 @@ class ChessBotOK(ChessBot):
             return (best_score, best_move)
 
     def move(self, board):
+        self.reset_counters()
         score, move = self.minimax(board, self.depth)
         return move
 
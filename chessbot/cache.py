@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from functools import partial
+
+from chess import WHITE, BLACK
+
+from .scorers import BoardScorer
+
+class CachedScorer(BoardScorer):
+    # Memoises another scorer's evaluate() in an LRU of cache_size positions.
+    # The key holds what the Zobrist hash covers (pieces, side to move,
+    # castling, en passant) without the cost of hashing it. Game-over checks
+    # depend on the move history and are never cached. total_scorings counts
+    # every request, hits and misses how the cache answered them. Unless
+    # persistent, the cache is emptied with the counters, once per move.
+    def __init__(self, scorer, cache_size=2 ** 16, persistent=False):
+        super().__init__()
+        self.inner = scorer() if isinstance(scorer, type) else scorer
+        self.vectorized = False
+        self.result_scores = self.inner.result_scores
+        self.pawn_value = self.inner.pawn_value
+        self.cache_size = cache_size
+        self.persistent = persistent
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['cache'] = OrderedDict()
+        return state
+
+    def reset_scorings(self):
+        super().reset_scorings()
+        self.inner.reset_scorings()
+        self.hits = 0
+        self.misses = 0
+        if not self.persistent:
+            self.cache.clear()
+
+    def get_hits(self):
+        return self.hits
+
+    def get_misses(self):
+        return self.misses
+
+    def collect_stats(self, stats):
+        super().collect_stats(stats)
+        stats.eval_cache_hits += self.hits
+        stats.eval_cache_misses += self.misses
+
+    def key(self, board):
+        return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                board.occupied_co[WHITE], board.occupied_co[BLACK], board.turn, board.castling_rights, board.ep_square)
+
+    def evaluate(self, board):
+        key = self.key(board)
+        score = self.cache.get(key)
+        if score is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return score
+
+        self.misses += 1
+        score = self.inner.evaluate(board)
+        self.cache[key] = score
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return score
+
+    def push(self, board, move):
+        self.inner.push(board, move)
+
+    def pop(self, board):
+        return self.inner.pop(board)
+
+def cached(scorer, cache_size=2 ** 16, persistent=False):
+    # a scorer factory for the bots, which build their scorer themselves
+    return partial(CachedScorer, scorer, cache_size=cache_size, persistent=persistent)
@@ -1,7 +1,9 @@
 from .bot import ChessBot
+from .minimaxers import SearchTimeout
 
 import chess
 import random
+import time
 
 class SimpleBot(ChessBot):
     def __init__(self, name, scorer, minimaxer, depth, *minimaxer_params):
@@ -12,9 +14,27 @@ class SimpleBot(ChessBot):
 
     def move(self, board):
         self.scorer.reset_scorings()
+        self.minimaxer.reset_counters()
+        move = self.minimaxer.tablebase_move(board)
+        if move is not None:
+            return move
+        self.minimaxer.set_principal_variation(board, [])
         score, move = self.minimaxer.minimax(board, self.depth)
         return move
 
+    def collect_stats(self, stats):
+        self.scorer.collect_stats(stats)
+        self.minimaxer.collect_stats(stats)
+        stats.max_depth = self.depth
+
+    def prepare_search(self, board):
+        self.scorer.reset_scorings()
+        self.minimaxer.reset_counters()
+        self.minimaxer.set_principal_variation(board, [])
+
+    def score_root_move(self, board, move, alpha=None):
+        return self.minimaxer.score_move(board, move, self.depth, alpha)
+
 class AdaptiveBot(ChessBot):
     def __init__(self, name, scorer, minimaxer, initial_depth, scoring_threshold, *minimaxer_params):
         super().__init__(name)
@@ -22,22 +42,81 @@ class AdaptiveBot(ChessBot):
         self.minimaxer = minimaxer(self, self.scorer, *minimaxer_params)
         self.depth = initial_depth
         self.min_depth = initial_depth
+        self.search_depth = initial_depth
         self.scoring_threshold = scoring_threshold
 
     def move(self, board):
         self.scorer.reset_scorings()
+        self.minimaxer.reset_counters()
         if board.fullmove_number <= 2:
             self.depth = self.min_depth
+        self.search_depth = self.depth
+        move = self.minimaxer.tablebase_move(board)
+        if move is not None:
+            return move
+        self.minimaxer.set_principal_variation(board, [])
         score, move = self.minimaxer.minimax(board, self.depth)
         # can we go deeper?
         if self.scorer.get_scorings() > self.scoring_threshold and self.depth > self.min_depth:
             self.depth -= 1
-            print("reducing depth")
         else:
             estimated_scorings = self.scorer.get_scorings() ** ((self.depth + 2) / (self.depth))
-            print("esitmated scorings", estimated_scorings)
             if estimated_scorings < self.scoring_threshold:
-                print("increasing depth")
                 self.depth += 1
         return move
 
+    def collect_stats(self, stats):
+        self.scorer.collect_stats(stats)
+        self.minimaxer.collect_stats(stats)
+        stats.max_depth = self.search_depth
+
+class TimedBot(ChessBot):
+    max_depth = 32
+
+    def __init__(self, name, scorer, minimaxer, time_budget_ms, *minimaxer_params):
+        super().__init__(name)
+        self.scorer = scorer()
+        self.minimaxer = minimaxer(self, self.scorer, *minimaxer_params)
+        self.time_budget_ms = time_budget_ms
+        self.depth = 0
+
+    def move(self, board):
+        self.scorer.reset_scorings()
+        self.minimaxer.reset_counters()
+
+        moves = self.possible_moves(board)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        move = self.minimaxer.tablebase_move(board)
+        if move is not None:
+            return move
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget_ms / 1000
+        root_ply = len(board.move_stack)
+        best_move, pv = moves[0], []
+        self.depth = 0
+
+        self.minimaxer.deadline = deadline
+        try:
+            for depth in range(1, self.max_depth + 1):
+                self.minimaxer.set_principal_variation(board, pv)
+                score, move = self.minimaxer.minimax(board, depth)
+                best_move, self.depth = move, depth
+                pv = self.minimaxer.principal_variation(board, depth)
+
+                # the next iteration costs several times this one, don't start it late
+                if time.perf_counter() - start > (deadline - start) / 2:
+                    break
+        except SearchTimeout:
+            while len(board.move_stack) > root_ply:
+                self.minimaxer.pop(board)
+        finally:
+            self.minimaxer.deadline = None
+
+        return best_move
+
+    def collect_stats(self, stats):
+        self.scorer.collect_stats(stats)
+        self.minimaxer.collect_stats(stats)
+        stats.max_depth = self.depth
@@ -0,0 +1,211 @@
+import chess
+from chess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+from .scorers import BoardScorer, SimpleScorer, ComplexScorer
+
+class IncrementalScorer(BoardScorer):
+    # Keeps evaluation state in step with the board as long as every
+    # push/pop of the search goes through the scorer. Whenever the board
+    # it was attached to changes behind its back it rebuilds from scratch.
+    def __init__(self):
+        super().__init__()
+        self.board = None
+        self.base_ply = 0
+        self.stack = []
+
+    def attached(self, board):
+        return board is self.board and len(board.move_stack) == self.base_ply + len(self.stack)
+
+    def attach(self, board):
+        self.board = board
+        self.base_ply = len(board.move_stack)
+        self.stack = []
+        self.rebuild(board)
+
+    def push(self, board, move):
+        if not self.attached(board):
+            self.attach(board)
+        self.stack.append(self.make(board, move))
+
+    def pop(self, board):
+        if self.stack and self.attached(board):
+            return self.unmake(board, self.stack.pop())
+        return board.pop()
+
+    def evaluate(self, board):
+        if not self.attached(board):
+            self.attach(board)
+        return self.value(board)
+
+    def rebuild(self, board):
+        pass
+
+    def make(self, board, move):
+        pass
+
+    def unmake(self, board, undo):
+        pass
+
+    def value(self, board):
+        pass
+
+class IncrementalSimpleScorer(IncrementalScorer, SimpleScorer):
+    scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN: 9, KING:0}
+    color_factors = {WHITE: 1, BLACK: -1}
+
+    def rebuild(self, board):
+        self.material = 0
+        for square, piece in board.piece_map().items():
+            self.material += self.scores[piece.piece_type] * self.color_factors[piece.color]
+
+    def make(self, board, move):
+        previous = self.material
+        factor = self.color_factors[board.turn]
+
+        if board.is_en_passant(move):
+            self.material += factor * self.scores[PAWN]
+        else:
+            captured = board.piece_type_at(move.to_square)
+            if captured:
+                self.material += factor * self.scores[captured]
+        if move.promotion:
+            self.material += factor * (self.scores[move.promotion] - self.scores[PAWN])
+
+        board.push(move)
+        return previous
+
+    def unmake(self, board, previous):
+        self.material = previous
+        return board.pop()
+
+    def value(self, board):
+        return self.material
+
+class IncrementalComplexScorer(IncrementalScorer, ComplexScorer):
+    scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN:9, KING:10}
+    color_factors = {WHITE: 1, BLACK: -1}
+    value_index = {1: 0, 3: 1, 5: 2, 9: 3, 10: 4}
+    values = [1, 3, 5, 9, 10]
+
+    # attack counts per (colour, square), split by attacker value so the
+    # weakest attacker survives removals, and each square's contribution
+    # to the score for both sides to move
+    def rebuild(self, board):
+        self.attackers_count = [[0] * 64 for _ in range(2)]
+        self.value_count = [[[0] * 64 for _ in self.values] for _ in range(2)]
+        self.contribution = [[0] * 64 for _ in range(2)]
+        self.totals = [0, 0]
+
+        for square in chess.scan_forward(board.occupied):
+            self.add_attacks(board, square)
+        for square in range(64):
+            self.update_square(board, square)
+
+    def add_attacks(self, board, square, delta=1):
+        piece = board.piece_at(square)
+        color = int(piece.color)
+        counts = self.attackers_count[color]
+        by_value = self.value_count[color][self.value_index[self.scores[piece.piece_type]]]
+        targets = board.attacks_mask(square)
+        for target in chess.scan_forward(targets):
+            counts[target] += delta
+            by_value[target] += delta
+        return targets
+
+    def weakest_attacker(self, color, square):
+        for index, by_value in enumerate(self.value_count[color]):
+            if by_value[square]:
+                return self.values[index]
+        return 12
+
+    def update_square(self, board, square):
+        piece = board.piece_at(square)
+        if piece:
+            piece_value = self.scores[piece.piece_type]
+            color = int(piece.color)
+            num_atk = self.attackers_count[1 - color][square]
+            num_def = self.attackers_count[color][square]
+
+            piece_score = 100 * piece_value
+            if num_atk > 0:
+                if num_def > 0:
+                    piece_score -= max(0, 50 * (piece_value - self.weakest_attacker(1 - color, square)))
+                else:
+                    piece_score -= 50 * piece_value
+
+            bonus = 10 * piece_value
+            factor = self.color_factors[piece.color]
+            # index 1 is WHITE to move, index 0 BLACK to move
+            for turn in (0, 1):
+                enough_defenders = num_atk - 1 if turn == color else num_atk
+                score = piece_score + bonus if num_def >= enough_defenders else piece_score
+                self.set_contribution(turn, square, score * factor)
+        else:
+            white, black = self.attackers_count[1][square], self.attackers_count[0][square]
+            if white > black:
+                score = self.square_scores[square]
+            elif white < black:
+                score = -self.square_scores[square]
+            else:
+                score = 0
+            self.set_contribution(0, square, score)
+            self.set_contribution(1, square, score)
+
+    def set_contribution(self, turn, square, score):
+        self.totals[turn] += score - self.contribution[turn][square]
+        self.contribution[turn][square] = score
+
+    def changed_squares(self, board, move):
+        changed = [move.from_square, move.to_square]
+        if board.is_en_passant(move):
+            changed.append(move.to_square + (-8 if board.turn == WHITE else 8))
+        elif board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            if board.is_kingside_castling(move):
+                changed += [chess.square(7, rank), chess.square(5, rank)]
+            else:
+                changed += [chess.square(0, rank), chess.square(3, rank)]
+        return changed
+
+    def affected_pieces(self, board, changed):
+        sliders = board.bishops | board.rooks | board.queens
+        affected = 0
+        for square in changed:
+            affected |= chess.BB_SQUARES[square] & board.occupied
+            affected |= (board.attackers_mask(WHITE, square) | board.attackers_mask(BLACK, square)) & sliders
+        return affected
+
+    def transition(self, board, before, changed, step):
+        # remove the attacks of everything touched by the move, play or take
+        # back the move and add back the attacks of whatever is there now
+        dirty = 0
+        for square in chess.scan_forward(before):
+            dirty |= self.add_attacks(board, square, -1)
+
+        step()
+
+        changed_mask = 0
+        for square in changed:
+            changed_mask |= chess.BB_SQUARES[square]
+        after = (before & ~changed_mask) | (changed_mask & board.occupied)
+        for square in chess.scan_forward(after):
+            dirty |= self.add_attacks(board, square)
+
+        for square in chess.scan_forward(dirty | changed_mask):
+            self.update_square(board, square)
+        return after
+
+    def make(self, board, move):
+        changed = self.changed_squares(board, move)
+        before = self.affected_pieces(board, changed)
+        after = self.transition(board, before, changed, lambda: board.push(move))
+        return (changed, after)
+
+    def unmake(self, board, undo):
+        changed, after = undo
+        moves = []
+        self.transition(board, after, changed, lambda: moves.append(board.pop()))
+        return moves[0]
+
+    def value(self, board):
+        return self.totals[int(board.turn)]
@@ -0,0 +1,73 @@
+from array import array
+
+import chess
+
+def encode_move(move):
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+def decode_move(code):
+    return chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+
+class SearchTree:
+    # Array-backed MCTS tree. A node is an index into parallel arrays holding
+    # the move that leads to it, its parent, visits, wins (for the player who
+    # made the move) and its children, which are stored as one contiguous block.
+    # Positions are not stored: they are rebuilt by replaying moves from the root.
+    def __init__(self):
+        self.moves = array('l', [-1])
+        self.parents = array('l', [-1])
+        self.visits = array('l', [0])
+        self.wins = array('d', [0.0])
+        self.first_child = array('l', [-1])
+        self.child_count = array('l', [0])
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add(self, move_code, parent, visits=0, wins=0.0):
+        self.moves.append(move_code)
+        self.parents.append(parent)
+        self.visits.append(visits)
+        self.wins.append(wins)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+
+    def move(self, node):
+        return decode_move(self.moves[node])
+
+    def is_expanded(self, node):
+        return self.first_child[node] != -1
+
+    def expand(self, node, moves):
+        self.first_child[node] = len(self.moves)
+        self.child_count[node] = len(moves)
+        for move in moves:
+            self.add(encode_move(move), node)
+
+    def children(self, node):
+        first = self.first_child[node]
+        return range(first, first + self.child_count[node]) if first != -1 else range(0)
+
+    def child_for(self, node, move):
+        code = encode_move(move)
+        for child in self.children(node):
+            if self.moves[child] == code:
+                return child
+        return None
+
+    def subtree(self, node):
+        # copy the subtree under node into a fresh tree, with node as its root
+        tree = SearchTree()
+        tree.visits[0], tree.wins[0] = self.visits[node], self.wins[node]
+        pending = [(node, 0)]
+        while pending:
+            old, new = pending.pop()
+            if not self.is_expanded(old):
+                continue
+            first = len(tree)
+            tree.first_child[new] = first
+            tree.child_count[new] = self.child_count[old]
+            for offset, child in enumerate(self.children(old)):
+                tree.add(self.moves[child], new, self.visits[child], self.wins[child])
+                pending.append((child, first + offset))
+        return tree
@@ -1,83 +1,269 @@
 import chess
 from chess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
 import random
+import time
+import numpy as np
+
+from .bot import SearchTimeout
+from .scorers import pack_board, is_drawn
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+from .ordering import MoveOrderer
+from .quiescence import Quiescence
+from .tablebase import TablebaseProbe
 
 class Minimaxer:
-    def __init__(self, bot, scorer):
+    table_size = 2 ** 16
+
+    def __init__(self, bot, scorer, q_depth=0, tablebase=None):
         self.possible_moves = bot.possible_moves
+        self.bot_check_time = bot.check_time
         self.scorer = scorer
+        self.table = TranspositionTable(self.table_size)
+        # q_depth > 0 resolves captures at the leaves instead of scoring them statically
+        self.quiescence = Quiescence(self.score_leaf, q_depth, scorer.pawn_value,
+                                     self.push, self.pop, self.check_time) if q_depth else None
+        # a TablebaseProbe or a Syzygy directory, probed at every node it covers
+        self.tablebase = TablebaseProbe(tablebase) if isinstance(tablebase, str) else tablebase
+        self.orderer = None
+        self.deadline = None
+        self.pv = []
+        self.root_ply = 0
+        self.nodes = 0
+        self.cutoffs = 0
+        self.re_searches = 0
+
+    def reset_counters(self):
+        self.table.reset_counters()
+        if self.quiescence is not None:
+            self.quiescence.reset_counters()
+        if self.tablebase is not None:
+            self.tablebase.reset_counters()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.re_searches = 0
+
+    def get_nodes(self):
+        return self.nodes
+
+    def get_cutoffs(self):
+        return self.cutoffs
+
+    def get_re_searches(self):
+        return self.re_searches
+
+    def get_q_nodes(self):
+        return self.quiescence.get_nodes() if self.quiescence is not None else 0
+
+    def collect_stats(self, stats):
+        stats.nodes += self.nodes + self.get_q_nodes()
+        stats.q_nodes += self.get_q_nodes()
+        stats.cutoffs += self.cutoffs
+        stats.re_searches += self.re_searches
+        stats.tt_hits += self.table.get_hits()
+        stats.tt_misses += self.table.get_misses()
+        if self.tablebase is not None:
+            stats.tb_probes += self.tablebase.get_probes()
 
     def score(self, board):
         return self.scorer.score(board)
 
+    def score_leaf(self, board):
+        return self.scorer.score_leaf(board)
+
+    def draw_score(self):
+        return self.scorer.result_scores["1/2-1/2"]
+
+    def tablebase_score(self, board): # from WHITE's side, None when the tables don't cover it
+        # never at the root, which has to come back with a move
+        if self.tablebase is None or len(board.move_stack) == self.root_ply:
+            return None
+        wdl = self.tablebase.wdl(board)
+        if wdl is None:
+            return None
+        # below any mate the search finds itself; wins spoilt by the 50-move rule are draws
+        win = self.scorer.result_scores["1-0"] // 2
+        score = win if wdl == 2 else -win if wdl == -2 else 0
+        return score if board.turn == WHITE else -score
+
+    def tablebase_move(self, board):
+        return self.tablebase.best_move(board) if self.tablebase is not None else None
+
+    def leaf_score(self, board): # from WHITE's side, like score
+        if self.quiescence is None:
+            return self.score_leaf(board)
+        color = 1 if board.turn == WHITE else -1
+        return color * self.quiescence.search(board, -10000000, 10000000)
+
+    def push(self, board, move):
+        self.scorer.push(board, move)
+
+    def pop(self, board):
+        return self.scorer.pop(board)
+
+    def check_time(self): # the bot's deadline applies too
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        self.bot_check_time()
+
+    def set_principal_variation(self, board, pv):
+        self.pv = pv
+        self.root_ply = len(board.move_stack)
+
+    def principal_variation(self, board, depth):
+        pv = []
+        while len(pv) < depth:
+            entry = self.table.probe(self.table.key(board))
+            if entry is None or entry.move is None or not board.is_legal(entry.move):
+                break
+            pv.append(entry.move)
+            board.push(entry.move)
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def ordered_moves(self, board, hash_move=None):
+        moves = self.possible_moves(board)
+        if self.orderer is not None:
+            moves = self.orderer.order(board, moves, len(board.move_stack), hash_move)
+            hash_move = None
+        ply = len(board.move_stack) - self.root_ply
+        for first in (hash_move, self.pv_move(board, ply)):
+            if first is not None and first in moves:
+                moves.remove(first)
+                moves.insert(0, first)
+        return moves
+
+    def pv_move(self, board, ply):
+        if 0 <= ply < len(self.pv) and board.move_stack[self.root_ply:] == self.pv[:ply]:
+            return self.pv[ply]
+        return None
+
     def minimax(self, board, depth):
         pass
 
+    def score_move(self, board, move, depth, alpha=None): # from the mover's side, alpha is ignored
+        color = 1 if board.turn == WHITE else -1
+        self.push(board, move)
+        score, _ = self.minimax(board, depth - 1)
+        self.pop(board)
+        return color * score
+
 class RegularMinimaxer(Minimaxer):
-    def __init__(self, bot, scorer):
-        super().__init__(bot, scorer)
+    def __init__(self, bot, scorer, q_depth=0, tablebase=None):
+        super().__init__(bot, scorer, q_depth, tablebase)
 
     def minimax(self, board, depth):
         # print ("minimax", depth, board.fen())
         # print("heuristic score,", self.score(board))
-        if depth == 0 or board.is_game_over():
-            return (self.score(board), None)
+        self.nodes += 1
+        if depth == 0:
+            return (self.leaf_score(board), None)
+        if is_drawn(board):
+            return (self.draw_score(), None)
+
+        tablebase_score = self.tablebase_score(board)
+        if tablebase_score is not None:
+            return (tablebase_score, None)
+
+        self.check_time()
+        key = self.table.key(board)
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            return (entry.score, entry.move)
+
+        moves = self.ordered_moves(board, entry.move if entry is not None else None)
+        if not moves:
+            return (self.scorer.no_moves_score(board), None)
 
         if board.turn == WHITE: # maximize:
             best_score = -10000000
             best_move = None
 
-            for move in self.possible_moves(board):
-                board.push(move)
+            for move in moves:
+                self.push(board, move)
                 move_score, _ = self.minimax(board, depth - 1)
-                board.pop()
+                self.pop(board)
 
                 if(move_score > best_score):
                     best_score, best_move = move_score, move
 
             # print ("depth ", depth, "-> chosen move", best_score, best_move)
+            self.table.store(key, depth, EXACT, best_score, best_move)
             return (best_score, best_move)
 
         else: # minimize
             best_score = 10000000
             best_move = None
 
-            for move in self.possible_moves(board):
-                board.push(move)
+            for move in moves:
+                self.push(board, move)
                 move_score, _ = self.minimax(board, depth - 1)
-                board.pop()
+                self.pop(board)
 
                 if move_score < best_score:
                     best_score, best_move = move_score, move
 
             # print ("depth ", depth, "-> chosen move", best_score, best_move)
+            self.table.store(key, depth, EXACT, best_score, best_move)
             return (best_score, best_move)
 
 class PriorityMinimaxer(Minimaxer):
-    def __init__(self, bot, scorer, best, random):
-        super().__init__(bot, scorer)
+    def __init__(self, bot, scorer, best, random, q_depth=0, tablebase=None):
+        super().__init__(bot, scorer, q_depth, tablebase)
         self.best = best
         self.random = random
 
     def score_potential_move(self, board, move):
-        board.push(move)
-        res = self.score(board)
-        board.pop()
+        self.push(board, move)
+        res = self.score_leaf(board)
+        self.pop(board)
         return res
 
+    def score_potential_moves(self, board, moves):
+        if not self.scorer.vectorized or not moves:
+            return [self.score_potential_move(board, move) for move in moves]
+
+        positions = []
+        for move in moves:
+            self.push(board, move)
+            positions.append(pack_board(board, leaf=True))
+            self.pop(board)
+        return self.scorer.score_batch(np.array(positions, dtype=np.uint64)).tolist()
+
+    def sorted_moves(self, board):
+        # the scores double as the children's values once depth runs out
+        moves = self.possible_moves(board)
+        scores = self.score_potential_moves(board, moves)
+        order = sorted(range(len(moves)), key=scores.__getitem__)
+        return [moves[i] for i in order], dict(zip(moves, scores))
+
     def minimax(self, board, depth):
         # print ("minimax", depth)
-        if depth == 0 or board.is_game_over():
+        self.nodes += 1
+        if depth == 0:
             # print(self.score(board))
-            return (self.score(board), None)
+            return (self.leaf_score(board), None)
+        if is_drawn(board):
+            return (self.draw_score(), None)
 
+        tablebase_score = self.tablebase_score(board)
+        if tablebase_score is not None:
+            return (tablebase_score, None)
+
+        self.check_time()
+        key = self.table.key(board)
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            return (entry.score, entry.move)
+
+        potential_moves, leaf_scores = self.sorted_moves(board)
+        if not potential_moves:
+            return (self.scorer.no_moves_score(board), None)
 
         if board.turn == WHITE: # maximize:
             best_score = -1000000
             best_move = None
 
-            potential_moves = [move for move in self.possible_moves(board)]
-            potential_moves.sort(key=lambda move:self.score_potential_move(board, move))
             # print("potential", len(potential_moves))
             
             selected_moves = potential_moves if len(potential_moves) < self.best + self.random else \
@@ -86,22 +272,25 @@ class PriorityMinimaxer(Minimaxer):
             # print("selected", len(selected_moves))
 
             for move in selected_moves:
-                board.push(move)
-                move_score, _ = self.minimax(board, depth - 1)
-                board.pop()
+                if depth == 1 and self.quiescence is None:
+                    self.nodes += 1
+                    move_score = leaf_scores[move]
+                else:
+                    self.push(board, move)
+                    move_score, _ = self.minimax(board, depth - 1)
+                    self.pop(board)
 
                 if(move_score > best_score):
                     best_score, best_move = move_score, move
 
             # print ("choice", depth, best_move, best_score)
+            self.table.store(key, depth, EXACT, best_score, best_move)
             return (best_score, best_move)
 
         else: # minimize
             best_score = 1000000
             best_move = None
 
-            potential_moves = [move for move in self.possible_moves(board)]
-            potential_moves.sort(key=lambda move:self.score_potential_move(board, move))
             # print("potential", len(potential_moves))
 
             selected_moves = potential_moves if len(potential_moves) < self.best + self.random else \
@@ -111,14 +300,242 @@ class PriorityMinimaxer(Minimaxer):
             # print(len(selected_moves))
 
             for move in selected_moves:
-                board.push(move)
-                move_score, _ = self.minimax(board, depth - 1)
-                board.pop()
+                if depth == 1 and self.quiescence is None:
+                    self.nodes += 1
+                    move_score = leaf_scores[move]
+                else:
+                    self.push(board, move)
+                    move_score, _ = self.minimax(board, depth - 1)
+                    self.pop(board)
 
                 if move_score < best_score:
                     best_score, best_move = move_score, move
 
             # print ("choice", depth, best_move, best_score)
+            self.table.store(key, depth, EXACT, best_score, best_move)
             return (best_score, best_move)
 
- 
+class AlphaBetaMinimaxer(Minimaxer):
+    # pvs searches every move after the first with a null window and searches
+    # again the ones that beat it. With aspiration_pawns, a search that follows
+    # another in the same move (iterative deepening) starts with a window that
+    # wide around the previous score and widens the side it fails on.
+    def __init__(self, bot, scorer, q_depth=0, tablebase=None, pvs=True, aspiration_pawns=0):
+        super().__init__(bot, scorer, q_depth, tablebase)
+        self.orderer = MoveOrderer()
+        self.pvs = pvs
+        self.aspiration_window = aspiration_pawns * scorer.pawn_value
+        self.previous_score = None
+
+    def reset_counters(self): # called once per move, so history is aged here too
+        super().reset_counters()
+        self.orderer.reset_counters()
+        self.orderer.age_history()
+        self.previous_score = None
+
+    def minimax(self, board, depth):
+        color = 1 if board.turn == WHITE else -1
+        if self.aspiration_window and self.previous_score is not None:
+            score, move = self.aspiration_search(board, depth, self.previous_score)
+        else:
+            score, move = self.negamax(board, depth, -10000000, 10000000)
+        self.previous_score = score
+        return (color * score, move)
+
+    def aspiration_search(self, board, depth, guess):
+        window = self.aspiration_window
+        alpha, beta = guess - window, guess + window
+        while True:
+            score, move = self.negamax(board, depth, alpha, beta)
+            if alpha > -10000000 and score <= alpha:
+                window *= 4
+                alpha = guess - window if window < self.scorer.result_scores["1-0"] else -10000000
+            elif beta < 10000000 and score >= beta:
+                window *= 4
+                beta = guess + window if window < self.scorer.result_scores["1-0"] else 10000000
+            else:
+                return (score, move)
+            self.re_searches += 1
+
+    def search_child(self, board, depth, alpha, beta, first, reduction=0):
+        # the child's score from the side to move at the parent
+        if first or not (self.pvs or reduction):
+            return -self.negamax(board, depth - 1, -beta, -alpha)[0]
+        score = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha)[0]
+        if score > alpha and (reduction or score < beta):
+            self.re_searches += 1
+            score = -self.negamax(board, depth - 1, -beta, -alpha)[0]
+        return score
+
+    def score_move(self, board, move, depth, alpha=None): # fail-soft, scores <= alpha are upper bounds
+        self.push(board, move)
+        score, _ = self.negamax(board, depth - 1, -10000000, 10000000 if alpha is None else -alpha)
+        self.pop(board)
+        return -score
+
+    def negamax(self, board, depth, alpha, beta): # side to move maximizes
+        self.nodes += 1
+        if depth == 0:
+            if self.quiescence is not None:
+                return (self.quiescence.search(board, alpha, beta), None)
+            color = 1 if board.turn == WHITE else -1
+            return (color * self.score_leaf(board), None)
+        if is_drawn(board):
+            return (self.draw_score(), None)
+
+        tablebase_score = self.tablebase_score(board)
+        if tablebase_score is not None:
+            color = 1 if board.turn == WHITE else -1
+            return (color * tablebase_score, None)
+
+        self.check_time()
+        key = self.table.key(board)
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            if entry.bound == EXACT or \
+                    (entry.bound == LOWER and entry.score >= beta) or \
+                    (entry.bound == UPPER and entry.score <= alpha):
+                return (entry.score, entry.move)
+
+        best_score = -10000000
+        best_move = None
+
+        moves = self.ordered_moves(board, entry.move if entry is not None else None)
+        if not moves:
+            color = 1 if board.turn == WHITE else -1
+            return (color * self.scorer.no_moves_score(board), None)
+        for index, move in enumerate(moves):
+            self.push(board, move)
+            move_score = self.search_child(board, depth, max(alpha, best_score), beta, index == 0)
+            self.pop(board)
+
+            if move_score > best_score:
+                best_score, best_move = move_score, move
+                if best_score >= beta:
+                    self.cutoffs += 1
+                    self.orderer.record_cutoff(board, move, len(board.move_stack), depth, index)
+                    break
+
+        if best_score <= alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(key, depth, bound, best_score, best_move)
+        return (best_score, best_move)
+
+class SelectiveMinimaxer(AlphaBetaMinimaxer):
+    # Alpha-beta that searches unpromising moves less instead of sampling them:
+    # - null move: if passing at depth - 1 - null_reduction still fails high, the
+    #   node is cut. Skipped in check and when the side to move has only pawns.
+    # - late move reductions: quiet moves after the first late_moves are searched
+    #   a ply shallower with a null window and re-searched in full if they beat alpha.
+    # - futility: one ply from the leaves, quiet moves are skipped when the static
+    #   score plus futility_pawns pawns cannot reach alpha.
+    # Any of them is turned off with 0.
+    def __init__(self, bot, scorer, q_depth=0, tablebase=None, null_reduction=2, late_moves=3, futility_pawns=3,
+                 pvs=True, aspiration_pawns=0):
+        super().__init__(bot, scorer, q_depth, tablebase, pvs, aspiration_pawns)
+        self.null_reduction = null_reduction
+        self.late_moves = late_moves
+        self.futility_margin = futility_pawns * scorer.pawn_value
+        self.null_cutoffs = 0
+        self.reductions = 0
+        self.futile = 0
+
+    def reset_counters(self):
+        super().reset_counters()
+        self.null_cutoffs = 0
+        self.reductions = 0
+        self.futile = 0
+
+    def get_null_cutoffs(self):
+        return self.null_cutoffs
+
+    def get_reductions(self):
+        return self.reductions
+
+    def get_futile(self):
+        return self.futile
+
+    def quiet(self, board, move):
+        return not move.promotion and not board.is_capture(move) and not board.gives_check(move)
+
+    def negamax(self, board, depth, alpha, beta, allow_null=True): # side to move maximizes
+        self.nodes += 1
+        color = 1 if board.turn == WHITE else -1
+        if depth <= 0:
+            if self.quiescence is not None:
+                return (self.quiescence.search(board, alpha, beta), None)
+            return (color * self.score_leaf(board), None)
+        if is_drawn(board):
+            return (self.draw_score(), None)
+
+        tablebase_score = self.tablebase_score(board)
+        if tablebase_score is not None:
+            return (color * tablebase_score, None)
+
+        self.check_time()
+        key = self.table.key(board)
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            if entry.bound == EXACT or \
+                    (entry.bound == LOWER and entry.score >= beta) or \
+                    (entry.bound == UPPER and entry.score <= alpha):
+                return (entry.score, entry.move)
+
+        in_check = board.is_check()
+        pieces = board.occupied_co[board.turn] & ~(board.pawns | board.kings)
+        if allow_null and self.null_reduction and depth > self.null_reduction and not in_check and pieces:
+            # the null move bypasses the scorer, incremental scorers rebuild after it
+            board.push(chess.Move.null())
+            score, _ = self.negamax(board, depth - 1 - self.null_reduction, -beta, -beta + 1, False)
+            board.pop()
+            if -score >= beta:
+                self.null_cutoffs += 1
+                return (beta, None)
+
+        futility_score = None
+        if depth == 1 and self.futility_margin and not in_check:
+            futility_score = color * self.score_leaf(board) + self.futility_margin
+            if futility_score > alpha:
+                futility_score = None
+
+        best_score = -10000000
+        best_move = None
+
+        moves = self.ordered_moves(board, entry.move if entry is not None else None)
+        if not moves:
+            return (color * self.scorer.no_moves_score(board), None)
+        for index, move in enumerate(moves):
+            floor = max(alpha, best_score)
+            quiet = (futility_score is not None or index >= self.late_moves) and self.quiet(board, move)
+            if futility_score is not None and quiet and index > 0:
+                self.futile += 1
+                best_score = max(best_score, futility_score)
+                continue
+
+            reduction = 0
+            if self.late_moves and index >= self.late_moves and depth >= 3 and not in_check and quiet:
+                self.reductions += 1
+                reduction = 1
+            self.push(board, move)
+            move_score = self.search_child(board, depth, floor, beta, index == 0, reduction)
+            self.pop(board)
+
+            if move_score > best_score:
+                best_score, best_move = move_score, move
+                if best_score >= beta:
+                    self.cutoffs += 1
+                    self.orderer.record_cutoff(board, move, len(board.move_stack), depth, index)
+                    break
+
+        if best_score <= alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(key, depth, bound, best_score, best_move)
+        return (best_score, best_move)
@@ -0,0 +1,63 @@
+from chess import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+class MoveOrderer:
+    # Orders moves without touching the scorer: hash move, then captures by
+    # MVV-LVA (and promotions), then the killer moves of the ply, then the
+    # rest by history score. The sort is stable, so ties keep the incoming order.
+    values = {PAWN: 1, KNIGHT: 3, BISHOP: 3, ROOK: 5, QUEEN: 9, KING: 10}
+
+    HASH_MOVE = 1 << 40
+    CAPTURE = 1 << 36
+    KILLER = 1 << 32
+
+    def __init__(self, n_killers=2):
+        self.n_killers = n_killers
+        self.killers = {}
+        self.history = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def get_cutoffs(self):
+        return self.cutoffs
+
+    def get_first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def age_history(self):
+        # halve between searches so old cutoffs fade
+        self.history = {key: value // 2 for key, value in self.history.items() if value > 1}
+
+    def move_key(self, board, move, ply, hash_move):
+        if move == hash_move:
+            return self.HASH_MOVE
+        victim = board.piece_type_at(move.to_square) or (PAWN if board.is_en_passant(move) else None)
+        if victim or move.promotion:
+            gain = 10 * self.values[victim] if victim else 0
+            gain += 10 * self.values[move.promotion] if move.promotion else 0
+            return self.CAPTURE + gain - self.values[board.piece_type_at(move.from_square)]
+        killers = self.killers.get(ply)
+        if killers and move in killers:
+            return self.KILLER + self.n_killers - killers.index(move)
+        return self.history.get((board.turn, move.from_square, move.to_square), 0)
+
+    def order(self, board, moves, ply, hash_move=None):
+        keys = {move: self.move_key(board, move, ply, hash_move) for move in moves}
+        return sorted(moves, key=keys.__getitem__, reverse=True)
+
+    def record_cutoff(self, board, move, ply, depth, index):
+        # board is the position the move was played from
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if board.is_capture(move) or move.promotion:
+            return
+
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.n_killers:]
+        key = (board.turn, move.from_square, move.to_square)
+        self.history[key] = self.history.get(key, 0) + depth * depth
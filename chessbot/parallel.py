@@ -0,0 +1,85 @@
+import random
+import time
+
+import chess
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .bot import ChessBot, make_bot, wall_deadline, local_deadline
+from .stats import SearchStats
+
+def search_root_move(bot_spec, fen, uci, alpha, seed, deadline=None):
+    # (score, SearchStats of the search); every task gets a fresh bot and its
+    # own seed, so the outcome does not depend on which worker ran what before
+    random.seed(seed)
+    bot = make_bot(bot_spec)
+    bot.deadline = local_deadline(deadline)
+    board = chess.Board(fen)
+    stats = bot.stats = SearchStats(bot.get_name(), len(board.move_stack))
+    try:
+        bot.prepare_search(board)
+        score = bot.score_root_move(board, chess.Move.from_uci(uci), alpha)
+    finally:
+        bot.stats = None
+    bot.collect_stats(stats)
+    return score, stats
+
+class ParallelBot(ChessBot):
+    # Root-split search: the root moves of the wrapped bot are scored in
+    # batches of n_workers, each batch searched with the best score so far
+    # as its alpha bound. The wrapped bot needs prepare_search/score_root_move.
+    def __init__(self, name, bot_spec, n_workers=2, seed=0):
+        super().__init__(name)
+        self.bot_spec = bot_spec
+        self.n_workers = n_workers
+        self.seed = seed
+        self.executor = None
+        self.worker_stats = [] # of the last move
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def root_moves(self, board):
+        start = time.perf_counter()
+        moves = sorted(board.legal_moves, key=lambda move: move.uci())
+        random.Random("{}:{}".format(self.seed, board.fen())).shuffle(moves)
+        if self.stats is not None:
+            self.stats.add_movegen(len(moves), time.perf_counter() - start)
+        return moves
+
+    def collect_stats(self, stats):
+        for worker_stats in self.worker_stats:
+            stats.add(worker_stats)
+
+    def move(self, board):
+        self.worker_stats = []
+        moves = self.root_moves(board)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.n_workers)
+
+        fen = board.fen()
+        deadline = wall_deadline(self.deadline)
+        best_score, best_move, alpha = None, None, None
+        for start in range(0, len(moves), self.n_workers):
+            batch = moves[start:start + self.n_workers]
+            futures = [self.executor.submit(search_root_move, self.bot_spec, fen, move.uci(), alpha,
+                                            "{}:{}:{}".format(self.seed, fen, move.uci()), deadline)
+                       for move in batch]
+            for move, future in zip(batch, futures):
+                score, stats = future.result()
+                self.worker_stats.append(stats)
+                if best_score is None or score > best_score:
+                    best_score, best_move = score, move
+            alpha = best_score
+
+        return best_move
@@ -0,0 +1,98 @@
+import argparse
+import time
+
+import chess
+
+from .bot import ChessBotDumb
+
+# (name, fen, perft counts from depth 1)
+PERFT_POSITIONS = [
+    ('start', chess.STARTING_FEN, (20, 400, 8902, 197281)),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', (48, 2039, 97862)),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', (14, 191, 2812, 43238)),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', (6, 264, 9467)),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', (44, 1486, 62379)),
+]
+
+class Perft:
+    # Counts leaf nodes with make/unmake through a move source: a bot's
+    # possible_moves, or list(board.legal_moves) as the python-chess baseline.
+    # bulk counts the last ply with legal_moves.count() instead of making the moves.
+    def __init__(self, moves, bulk=False):
+        self.moves = moves
+        self.bulk = bulk
+        self.pushes = 0
+
+    def count(self, board, depth):
+        if depth == 0:
+            return 1
+        if depth == 1 and self.bulk:
+            return board.legal_moves.count()
+        nodes = 0
+        for move in self.moves(board):
+            board.push(move)
+            self.pushes += 1
+            nodes += self.count(board, depth - 1)
+            board.pop()
+        return nodes
+
+def move_sources():
+    shuffled = ChessBotDumb('perft')
+    unshuffled = ChessBotDumb('perft')
+    unshuffled.shuffle_moves = False
+    return {
+        'possible_moves': shuffled.possible_moves,
+        'no_shuffle': unshuffled.possible_moves,
+        'legal_moves': lambda board: list(board.legal_moves),
+    }
+
+def run_perft(positions, depth, bulk=False, repeat=3):
+    # sources take turns on each position and the best of repeat runs counts
+    rows = []
+    for name, fen, counts in positions:
+        d = min(depth, len(counts))
+        for source, moves in move_sources().items():
+            best = None
+            for _ in range(repeat):
+                perft = Perft(moves, bulk)
+                start = time.perf_counter()
+                nodes = perft.count(chess.Board(fen), d)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            rows.append({
+                'source': source,
+                'position': name,
+                'depth': d,
+                'nodes': nodes,
+                'correct': nodes == counts[d - 1],
+                'seconds': best,
+                'nodes_per_sec': nodes / best,
+                'pushes_per_sec': perft.pushes / best,
+            })
+    return rows
+
+def print_perft_rows(rows):
+    baseline = {row['position']: row['seconds'] for row in rows if row['source'] == 'legal_moves'}
+    print("{:<16}{:<11}{:>6}{:>10}{:>8}{:>12}{:>13}{:>10}".format(
+        "source", "position", "depth", "nodes", "ok", "nodes/sec", "pushes/sec", "overhead"))
+    for row in rows:
+        print("{:<16}{:<11}{:>6}{:>10}{:>8}{:>12.0f}{:>13.0f}{:>9.2f}x".format(
+            row['source'], row['position'], row['depth'], row['nodes'], str(row['correct']),
+            row['nodes_per_sec'], row['pushes_per_sec'], row['seconds'] / baseline[row['position']]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft move generation and make/unmake throughput")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--bulk', action='store_true', help='count the last ply without making the moves')
+    parser.add_argument('--positions', nargs='+', choices=[name for name, _, _ in PERFT_POSITIONS])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    positions = [p for p in PERFT_POSITIONS if args.positions is None or p[0] in args.positions]
+    rows = run_perft(positions, args.depth, args.bulk, args.repeat)
+    print_perft_rows(rows)
+    if not all(row['correct'] for row in rows):
+        raise SystemExit("perft counts do not match")
+
+if __name__ == '__main__':
+    main()
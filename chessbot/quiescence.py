@@ -0,0 +1,78 @@
+import chess
+from chess import WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+from .ordering import MoveOrderer
+
+class Quiescence:
+    # Capture-only search run at the leaves of a main search so that leaves are
+    # not scored in the middle of an exchange. evaluate(board) scores from
+    # WHITE's side, search() returns the score for the side to move. Quiet
+    # positions stand pat; in check every evasion is searched. Captures that
+    # cannot bring the score back up to alpha are skipped (delta pruning).
+    values = {PAWN: 1, KNIGHT: 3, BISHOP: 3, ROOK: 5, QUEEN: 9, KING: 0}
+    delta_pawns = 2
+
+    def __init__(self, evaluate, max_depth=6, pawn_value=1, push=None, pop=None, check_time=None):
+        self.evaluate = evaluate
+        self.max_depth = max_depth
+        self.pawn_value = pawn_value
+        self.push = push if push is not None else lambda board, move: board.push(move)
+        self.pop = pop if pop is not None else lambda board: board.pop()
+        self.check_time = check_time
+        self.orderer = MoveOrderer()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.nodes = 0
+
+    def get_nodes(self):
+        return self.nodes
+
+    def tactical_moves(self, board):
+        moves = [move for move in board.generate_legal_captures() if move.promotion in (None, QUEEN)]
+        moves += [move for move in board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS)
+                  if move.promotion == QUEEN and not board.is_capture(move)]
+        return self.orderer.order(board, moves, None)
+
+    def gain(self, board, move):
+        victim = board.piece_type_at(move.to_square) or (PAWN if board.is_en_passant(move) else None)
+        gain = self.values[victim] if victim else 0
+        if move.promotion:
+            gain += self.values[move.promotion] - 1
+        return gain * self.pawn_value
+
+    def search(self, board, alpha, beta, ply=0):
+        self.nodes += 1
+        if self.check_time is not None:
+            self.check_time()
+        color = 1 if board.turn == WHITE else -1
+
+        in_check = board.is_check()
+        if in_check and ply < self.max_depth:
+            moves = list(board.generate_legal_moves())
+            if not moves:
+                return color * self.evaluate(board)
+            best_score, stand_pat = -10000000, None
+        else:
+            stand_pat = color * self.evaluate(board)
+            if stand_pat >= beta or ply >= self.max_depth:
+                return stand_pat
+            moves = self.tactical_moves(board)
+            best_score = stand_pat
+            alpha = max(alpha, stand_pat)
+
+        margin = self.delta_pawns * self.pawn_value
+        for move in moves:
+            if stand_pat is not None and stand_pat + self.gain(board, move) + margin <= alpha:
+                continue
+            self.push(board, move)
+            score = -self.search(board, -beta, -alpha, ply + 1)
+            self.pop(board)
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
@@ -0,0 +1,75 @@
+import random
+import time
+
+import chess
+
+from .scorers import SimpleScorer
+
+class RolloutEngine:
+    # Random playouts played in place on one board and taken back afterwards.
+    # Results are from WHITE's side: 1 win, -1 loss, 0 draw. Playouts longer
+    # than max_plies are adjudicated by the scorer, a lead of at least
+    # eval_margin counting as a win. Repetitions are not detected.
+    def __init__(self, max_plies=200, scorer=None, eval_margin=3, rng=None):
+        self.max_plies = max_plies
+        self.scorer = scorer if scorer is not None else SimpleScorer()
+        self.eval_margin = eval_margin
+        self.rng = rng if rng is not None else random
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.playouts = 0
+        self.plies = 0
+        self.elapsed = 0.0
+
+    def get_playouts(self):
+        return self.playouts
+
+    def get_playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def random_move(self, board):
+        # uniform over legal moves: draw pseudo-legal ones until a legal one comes up.
+        # Reservoir sampling generate_legal_moves() avoids the list but checks every
+        # move's legality and draws a number per move, about 1.5x slower per ply.
+        moves = list(board.generate_pseudo_legal_moves())
+        randrange = self.rng.randrange
+        while moves:
+            i = randrange(len(moves))
+            move = moves[i]
+            if not board.is_into_check(move):
+                return move
+            moves[i] = moves[-1]
+            moves.pop()
+        return None
+
+    def playout(self, board):
+        start = time.perf_counter()
+        plies = 0
+        result = None
+
+        while result is None:
+            if plies >= self.max_plies:
+                score = self.scorer.scorer(board)
+                result = 1 if score >= self.eval_margin else -1 if score <= -self.eval_margin else 0
+                break
+
+            move = self.random_move(board)
+            if move is None:
+                result = (-1 if board.turn == chess.WHITE else 1) if board.is_check() else 0
+                break
+
+            material_changed = move.promotion or board.is_capture(move)
+            board.push(move)
+            plies += 1
+
+            if board.halfmove_clock >= 150 or (material_changed and board.is_insufficient_material()):
+                result = 0
+
+        for _ in range(plies):
+            board.pop()
+
+        self.playouts += 1
+        self.plies += plies
+        self.elapsed += time.perf_counter() - start
+        return result
@@ -1,45 +1,196 @@
+import time
+
 import chess
+import numpy as np
 from chess import SquareSet
 from chess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
 
+# Packed positions are rows of uint64: the twelve piece bitboards (white
+# pawn..king, black pawn..king), side to move, castling rights, en passant
+# square (64 for none) and the result (0 ongoing, 1 white won, 2 black won, 3 draw).
+PACKED_PIECES = [(color, piece_type) for color in (WHITE, BLACK) for piece_type in chess.PIECE_TYPES]
+PACKED_TURN, PACKED_CASTLING, PACKED_EP, PACKED_RESULT = 12, 13, 14, 15
+PACKED_WIDTH = 16
+RESULT_CODES = {"1-0": 1, "0-1": 2, "1/2-1/2": 3}
+RESULT_NAMES = {code: result for result, code in RESULT_CODES.items()}
+
+def is_drawn(board): # the draws that need no move generation
+    return board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition()
+
+def no_moves_result(board):
+    return ("0-1" if board.turn == WHITE else "1-0") if board.is_check() else "1/2-1/2"
+
+def has_king_move(board):
+    # a king that is not in check and has a safe square has a legal move,
+    # which rules out mate and stalemate without generating moves
+    king = board.king(board.turn)
+    if king is None or board.is_check():
+        return False
+    for square in chess.scan_forward(chess.BB_KING_ATTACKS[king] & ~board.occupied_co[board.turn]):
+        if not board.is_attacked_by(not board.turn, square):
+            return True
+    return False
+
+def leaf_result(board):
+    # the result as seen from a search leaf, None while the game goes on
+    if not has_king_move(board) and not any(board.generate_legal_moves()):
+        return no_moves_result(board)
+    return "1/2-1/2" if is_drawn(board) else None
+
+def pack_board(board, leaf=False):
+    row = [board.pieces_mask(piece_type, color) for color, piece_type in PACKED_PIECES]
+    row.append(int(board.turn))
+    row.append(board.castling_rights)
+    row.append(64 if board.ep_square is None else board.ep_square)
+    if leaf:
+        result = leaf_result(board)
+    else:
+        result = board.result() if board.is_game_over() else None
+    row.append(RESULT_CODES[result] if result is not None else 0)
+    return row
+
+def pack_boards(boards):
+    return np.array([pack_board(board) for board in boards], dtype=np.uint64).reshape(-1, PACKED_WIDTH)
+
+def unpack_board(row):
+    board = chess.Board(None)
+    for (color, piece_type), mask in zip(PACKED_PIECES, row):
+        for square in chess.scan_forward(int(mask)):
+            board.set_piece_at(square, chess.Piece(piece_type, color))
+    board.turn = bool(row[PACKED_TURN])
+    board.castling_rights = int(row[PACKED_CASTLING])
+    board.ep_square = None if row[PACKED_EP] == 64 else int(row[PACKED_EP])
+    return board
+
+def unpack_squares(positions):
+    # (N, 12, 64) array of 0/1 piece occupancy
+    masks = np.ascontiguousarray(positions[:, :12], dtype='<u8')
+    return np.unpackbits(masks.view(np.uint8).reshape(len(positions), 12, 8), axis=2, bitorder='little')
+
 class BoardScorer:
+    vectorized = False
+    result_scores = {"1-0": 1, "1/2-1/2": 0, "0-1": -1}
+    pawn_value = 1 # rough worth of a pawn on this scorer's scale
+
     def __init__(self):
         self.total_scorings = 0
+        self.scoring_time = 0.0
 
     def reset_scorings(self):
         self.total_scorings = 0
+        self.scoring_time = 0.0
 
     def get_scorings(self):
         return self.total_scorings
 
+    def collect_stats(self, stats):
+        stats.leaf_evals += self.total_scorings
+        stats.eval_time += self.scoring_time
+
     def scorer(self, board):
+        if board.is_game_over():
+            return self.result_scores[board.result()]
+        return self.evaluate(board)
+
+    def evaluate(self, board): # the position alone, the game is not over
         pass
 
+    def leaf_scorer(self, board):
+        # for search leaves, see leaf_result; the search scores the nodes it
+        # finds without moves with no_moves_score
+        result = leaf_result(board)
+        return self.evaluate(board) if result is None else self.result_scores[result]
+
+    def no_moves_score(self, board):
+        return self.result_scores[no_moves_result(board)]
+
     def score(self, board):
         self.total_scorings += 1
-        return self.scorer(board)
+        start = time.perf_counter()
+        score = self.scorer(board)
+        self.scoring_time += time.perf_counter() - start
+        return score
+
+    def score_leaf(self, board):
+        self.total_scorings += 1
+        start = time.perf_counter()
+        score = self.leaf_scorer(board)
+        self.scoring_time += time.perf_counter() - start
+        return score
+
+    def score_batch(self, boards_or_positions):
+        if isinstance(boards_or_positions, np.ndarray):
+            positions = boards_or_positions
+        elif self.vectorized:
+            positions = pack_boards(boards_or_positions)
+        else:
+            return np.array([self.score(board) for board in boards_or_positions])
+
+        self.total_scorings += len(positions)
+        start = time.perf_counter()
+        scores = self.batch_scorer(positions)
+        self.scoring_time += time.perf_counter() - start
+        return scores
+
+    def batch_scorer(self, positions):
+        scores = np.zeros(len(positions), dtype=np.int64)
+        for i, row in enumerate(positions):
+            if row[PACKED_RESULT]:
+                scores[i] = self.result_score(int(row[PACKED_RESULT]))
+            else:
+                scores[i] = self.evaluate(unpack_board(row))
+        return scores
+
+    def result_score(self, code):
+        return self.result_scores[RESULT_NAMES[code]]
+
+    def push(self, board, move):
+        board.push(move)
+
+    def pop(self, board):
+        return board.pop()
 
 class SimpleScorer(BoardScorer):
+    # evaluate is a few popcounts, cheaper than packing every child for
+    # batch_scorer, so searches score boards one at a time; batch_scorer still
+    # serves arrays that are already packed
+    vectorized = False
+    result_scores = {"1-0": 10000, "1/2-1/2": 0, "0-1": -10000}
+    scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN: 9, KING:0}
+    material = tuple((piece_type, value) for piece_type, value in scores.items() if value)
+
+    # material as a piece-square table over the packed piece order
+    piece_square_table = np.repeat(np.outer([1, -1], list(map(scores.get, chess.PIECE_TYPES))).reshape(-1, 1), 64, axis=1)
+    # by result code
+    terminal_scores = np.array([0, result_scores["1-0"], result_scores["0-1"], result_scores["1/2-1/2"]])
+
     def __init__(self):
         super().__init__()
 
-    def scorer(self, board): # WHITE maximizes, BLACK minimizes
-        if board.is_game_over():
-            return {"1-0": 10000, "1/2-1/2": 0, "0-1": -10000}[board.result()]
+    def batch_scorer(self, positions):
+        scores = np.einsum('nps,ps->n', unpack_squares(positions), self.piece_square_table)
+        results = positions[:, PACKED_RESULT].astype(np.int64)
+        return np.where(results > 0, self.terminal_scores[results], scores)
 
+    def evaluate(self, board): # WHITE maximizes, BLACK minimizes
+        popcount, pieces_mask = chess.popcount, board.pieces_mask
         res = 0
-        scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN: 9, KING:0}
-        color_factors = {WHITE: 1, BLACK: -1}
-
-        for square in range(64):
-           piece = board.piece_at(square)
-           if piece: res += scores[piece.piece_type] * color_factors[piece.color]
-        
+        for piece_type, value in self.material:
+            res += value * (popcount(pieces_mask(piece_type, WHITE)) - popcount(pieces_mask(piece_type, BLACK)))
         return res
 
 class ComplexScorer(BoardScorer):
+    result_scores = {"1-0": 100000, "1/2-1/2": 0, "0-1": -100000}
+    pawn_value = 100
+    scores = (0, 1, 3, 3, 5, 9, 10) # by piece type
+    no_attackers = (0,) * 64
+    no_weakest = (12,) * 64
+
     def __init__(self):
         super().__init__()
+        # per colour and square, cleared and refilled by every evaluate
+        self.scratch_counts = [[0] * 64 for _ in range(2)]
+        self.scratch_weakest = [[12] * 64 for _ in range(2)]
 
     square_scores = [5] * 64
     square_scores[chess.D4] = 10
@@ -47,79 +198,228 @@ class ComplexScorer(BoardScorer):
     square_scores[chess.E4] = 10
     square_scores[chess.D5] = 10
 
-    def scorer(self, board): # WHITE maximizes, BLACK minimizes
-        if board.is_game_over():
-            return {"1-0": 100000, "1/2-1/2": 0, "0-1": -100000}[board.result()]
+    def evaluate(self, board): # WHITE maximizes, BLACK minimizes
+        scores = self.scores
+        attackers_count, weakest_attacker = self.scratch_counts, self.scratch_weakest
+        for color in (BLACK, WHITE):
+            attackers_count[color][:] = self.no_attackers
+            weakest_attacker[color][:] = self.no_weakest
+
+        white = board.occupied_co[WHITE]
+        for square in chess.scan_forward(board.occupied):
+            color = bool(white & chess.BB_SQUARES[square])
+            piece_score = scores[board.piece_type_at(square)]
+            counts, weakest = attackers_count[color], weakest_attacker[color]
+            for target in chess.scan_forward(board.attacks_mask(square)):
+                counts[target] += 1
+                if piece_score < weakest[target]:
+                    weakest[target] = piece_score
 
         res = 0
-        scores = {PAWN:1, KNIGHT:3, BISHOP:3, ROOK:5, QUEEN:9, KING:10}
-        color_factors = {WHITE: 1, BLACK: -1}
-
-        white_territory = 0
-        black_territory = 0
-
-        score_board = [[0]*8 for _ in range(8)]
-        attackers_count = [[0] * 64 for _ in range(2)]
-        weakest_attacker = [[12] * 64 for _ in range(2)]
-               
-        for square in range(64):
-            piece = board.piece_at(square)
-            if piece:
-                piece_score = scores[piece.piece_type]
-                targets = board.attacks(square)
-                for target in targets:
-                    attackers_count[int(piece.color)][target] += 1
-                    if piece_score < weakest_attacker[int(piece.color)][target]:
-                        weakest_attacker[int(piece.color)][target] = piece_score
-
-        for square in range(64):
-            piece = board.piece_at(square)
-
-            if piece:
-                # print(square)
-                # print(piece)
-                piece_score = 100 * scores[piece.piece_type]
-                # print("base", piece_score)
-                num_atk = attackers_count[not piece.color][square]
-                num_def = attackers_count[piece.color][square]
-
-                # print(num_atk)
-                # print(num_def)
-
-                to_move = board.turn == chess.WHITE if piece.color == chess.WHITE \
-                    else board.turn == chess.BLACK
-
-                # penalty for attackers
-                if num_atk > 0:
-                    if num_def > 0: # if there are defenders, penalize for weakest attacker
-                        piece_score -= max(0, 50 * (scores[piece.piece_type] - weakest_attacker[not piece.color][square]))
-                    else: #penalty if there is any attacker
-                        piece_score -= 50 * scores[piece.piece_type]
-
-                # print("after penalty", piece_score)
-
-                #bonux for defenders
-                enough_defenders = num_atk - 1 if to_move else num_atk
-                # print(enough_defenders)
-                if num_def >= enough_defenders: piece_score += 10 * scores[piece.piece_type]
-
-                # print("after_bonus", piece_score)
-
-                score_board[square//8][square%8] = piece_score * color_factors[piece.color]
-                res += piece_score * color_factors[piece.color]
-            else: # empty square, compute territory bonuses
-                square_worth = self.square_scores[square]
-                if attackers_count[int(chess.WHITE)][square] > attackers_count[int(chess.BLACK)][square]:
-                    res += square_worth
-                    score_board[square//8][square%8] = square_worth
-                elif attackers_count[int(chess.WHITE)][square] < attackers_count[int(chess.BLACK)][square]:
-                    res -= square_worth
-                    score_board[square//8][square%8] = -square_worth
-
-        # print(board)
-        # for i in range(8):
-        #    print(score_board[i])
+        for square in chess.scan_forward(board.occupied):
+            color = bool(white & chess.BB_SQUARES[square])
+            value = scores[board.piece_type_at(square)]
+            piece_score = 100 * value
+            num_atk = attackers_count[not color][square]
+            num_def = attackers_count[color][square]
+
+            # penalty for attackers
+            if num_atk > 0:
+                if num_def > 0: # if there are defenders, penalize for weakest attacker
+                    piece_score -= max(0, 50 * (value - weakest_attacker[not color][square]))
+                else: #penalty if there is any attacker
+                    piece_score -= 50 * value
+
+            #bonux for defenders
+            enough_defenders = num_atk - 1 if board.turn == color else num_atk
+            if num_def >= enough_defenders: piece_score += 10 * value
+
+            res += piece_score if color == WHITE else -piece_score
+
+        # empty squares, territory bonuses
+        white_count, black_count = attackers_count[WHITE], attackers_count[BLACK]
+        for square in chess.scan_forward(~board.occupied & chess.BB_ALL):
+            if white_count[square] > black_count[square]:
+                res += self.square_scores[square]
+            elif white_count[square] < black_count[square]:
+                res -= self.square_scores[square]
 
         return res
 
+class BitboardComplexScorer(ComplexScorer):
+    # Same scores as ComplexScorer computed with whole-board integer operations.
+    # Attack counts are kept bit-sliced: plane i holds bit i of every square's
+    # attacker count, so counts are added and compared 64 squares at a time.
+    values = (1, 3, 5, 9, 10)
+
+    territory_masks = {}
+    for square, square_worth in enumerate(ComplexScorer.square_scores):
+        territory_masks[square_worth] = territory_masks.get(square_worth, 0) | chess.BB_SQUARES[square]
+    territory_masks = list(territory_masks.items())
+    del square, square_worth
+
+    @staticmethod
+    def count(masks):
+        # ripple-carry add of every attack mask into five planes (counts up to 31)
+        p0 = p1 = p2 = p3 = p4 = 0
+        for mask in masks:
+            carry = p0 & mask
+            p0 ^= mask
+            if carry:
+                mask = p1 & carry
+                p1 ^= carry
+                if mask:
+                    carry = p2 & mask
+                    p2 ^= mask
+                    if carry:
+                        mask = p3 & carry
+                        p3 ^= carry
+                        p4 ^= mask
+        return [p0, p1, p2, p3, p4]
 
+    @staticmethod
+    def increment(planes):
+        carry = chess.BB_ALL
+        result = []
+        for plane in planes:
+            result.append(plane ^ carry)
+            carry &= plane
+        return result
+
+    @staticmethod
+    def compare(left, right):
+        l0, l1, l2, l3, l4 = left
+        r0, r1, r2, r3, r4 = right
+        greater = l4 & ~r4
+        equal = ~(l4 ^ r4)
+        greater |= equal & l3 & ~r3
+        equal &= ~(l3 ^ r3)
+        greater |= equal & l2 & ~r2
+        equal &= ~(l2 ^ r2)
+        greater |= equal & l1 & ~r1
+        equal &= ~(l1 ^ r1)
+        greater |= equal & l0 & ~r0
+        equal &= ~(l0 ^ r0)
+        return greater, equal
+
+    def attack_masks(self, board, color):
+        occupied = board.occupied
+        own = board.occupied_co[color]
+        diag_attacks, diag_masks = chess.BB_DIAG_ATTACKS, chess.BB_DIAG_MASKS
+        rank_attacks, rank_masks = chess.BB_RANK_ATTACKS, chess.BB_RANK_MASKS
+        file_attacks, file_masks = chess.BB_FILE_ATTACKS, chess.BB_FILE_MASKS
+
+        pawns = board.pawns & own
+        if color == WHITE:
+            masks = [(pawns & ~chess.BB_FILE_A) << 7 & chess.BB_ALL, (pawns & ~chess.BB_FILE_H) << 9 & chess.BB_ALL]
+        else:
+            masks = [(pawns & ~chess.BB_FILE_A) >> 9, (pawns & ~chess.BB_FILE_H) >> 7]
+        by_value = [masks[0] | masks[1], 0, 0, 0, 0]
+
+        for square in chess.scan_forward(board.knights & own):
+            mask = chess.BB_KNIGHT_ATTACKS[square]
+            masks.append(mask)
+            by_value[1] |= mask
+        for square in chess.scan_forward(board.bishops & own):
+            mask = diag_attacks[square][diag_masks[square] & occupied]
+            masks.append(mask)
+            by_value[1] |= mask
+        for square in chess.scan_forward(board.rooks & own):
+            mask = rank_attacks[square][rank_masks[square] & occupied] | \
+                file_attacks[square][file_masks[square] & occupied]
+            masks.append(mask)
+            by_value[2] |= mask
+        for square in chess.scan_forward(board.queens & own):
+            mask = diag_attacks[square][diag_masks[square] & occupied] | \
+                rank_attacks[square][rank_masks[square] & occupied] | \
+                file_attacks[square][file_masks[square] & occupied]
+            masks.append(mask)
+            by_value[3] |= mask
+        for square in chess.scan_forward(board.kings & own):
+            mask = chess.BB_KING_ATTACKS[square]
+            masks.append(mask)
+            by_value[4] |= mask
+
+        return masks, by_value, by_value[0] | by_value[1] | by_value[2] | by_value[3] | by_value[4]
+
+    def attacks(self, board):
+        return self.attack_masks(board, WHITE) + self.attack_masks(board, BLACK)
+
+    def scorer(self, board): # WHITE maximizes, BLACK minimizes
+        attacks = self.attacks(board)
+        white_attacks, black_attacks = attacks[2], attacks[5]
+
+        # a king that is not in check and has a safe square rules out mate and
+        # stalemate, which saves generating legal moves just to find one
+        enemy_attacks = black_attacks if board.turn == WHITE else white_attacks
+        king = board.kings & board.occupied_co[board.turn]
+        king_escapes = chess.BB_KING_ATTACKS[chess.lsb(king)] & ~board.occupied_co[board.turn] & ~enemy_attacks if king else 0
+        if king & enemy_attacks or not king_escapes:
+            game_over = board.is_game_over()
+        else:
+            game_over = board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition()
+        if game_over:
+            return self.result_scores[board.result()]
+        return self.evaluate(board, attacks)
+
+    def leaf_scorer(self, board): # the king escape test above already makes scorer cheap
+        return self.scorer(board)
+
+    def evaluate(self, board, attacks=None):
+        white_masks, white_values, white_attacks, black_masks, black_values, black_attacks = \
+            attacks or self.attacks(board)
+
+        popcount = chess.popcount
+        values = self.values
+        white_planes, black_planes = self.count(white_masks), self.count(black_masks)
+
+        res = 0
+        sides = ((WHITE, 1, white_planes, white_attacks, black_planes, black_attacks, black_values),
+                 (BLACK, -1, black_planes, black_attacks, white_planes, white_attacks, white_values))
+        for color, factor, defenders, defended, attackers, attacked, attacker_values in sides:
+            own = board.occupied_co[color]
+            pieces = (board.pawns & own, (board.knights | board.bishops) & own, board.rooks & own,
+                      board.queens & own, board.kings & own)
+
+            # material plus the defender bonus, as if no piece were attacked
+            res += factor * 110 * (popcount(pieces[0]) + 3 * popcount(pieces[1]) + 5 * popcount(pieces[2]) +
+                                   9 * popcount(pieces[3]) + 10 * popcount(pieces[4]))
+
+            targets = own & attacked
+            if not targets:
+                continue
+
+            if board.turn == color: # one defender short is still enough for the side to move
+                defenders = self.increment(defenders)
+            greater, equal = self.compare(defenders, attackers)
+            outnumbered = targets & ~(greater | equal)
+            hanging = targets & ~defended
+            exchanged = targets & defended
+
+            # squares whose weakest attacker has each value
+            weakest = []
+            weaker = 0
+            for mask in attacker_values:
+                weakest.append(mask & ~weaker)
+                weaker |= mask
+
+            for i in range(5):
+                mask = pieces[i] & targets
+                if not mask:
+                    continue
+                value = values[i]
+                penalty = value * (50 * popcount(mask & hanging) + 10 * popcount(mask & outnumbered))
+                mask &= exchanged
+                if mask:
+                    for j in range(i):
+                        penalty += 50 * (value - values[j]) * popcount(mask & weakest[j])
+                res -= factor * penalty
+
+        white_more, equal = self.compare(white_planes, black_planes)
+        empty = ~board.occupied
+        white_more &= empty
+        black_more = empty & ~(white_more | equal)
+        for square_worth, mask in self.territory_masks:
+            res += square_worth * (popcount(white_more & mask) - popcount(black_more & mask))
+
+        return res
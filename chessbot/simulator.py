@@ -1,15 +1,14 @@
 import time
 
 import chess
-import chess.svg
 
 import numpy as np
 import random as rnd
 
-from .bot import ChessBot
+from .bot import ChessBot, SearchTimeout
+from .stats import append_jsonl
 
-from IPython.display import SVG, display, clear_output
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError
 
 
 class ChessSimulator:
@@ -23,18 +22,70 @@ class ChessSimulator:
 
         self.p1 = player1
         self.p2 = player2
+        # (uci moves, winner) per game
         self.results = []
+        # SearchStats.to_dict() of every move played, tagged with the game
+        self.search_stats = []
 
         self.players = [self.p1, self.p2]
         if shuffle: rnd.shuffle(self.players)
 
+    # IPython and SVG rendering are only loaded when something is displayed
+    def board_svg(self, board, size):
+        import chess.svg
+        from IPython.display import SVG
+        return SVG(chess.svg.board(board=board, size=size))
+
     def print_board(self, svg, clear=True):
+        from IPython.display import display, clear_output
         if clear: clear_output(wait=True)
         display(svg)
         print(self.board.fen())
 
-    def simulate(self, rounds=4, timeout=10, turn_sleep_ms=0, verbose_size=450, verbose=True):
+    def game_board(self, index):
+        board = chess.Board()
+        for uci in self.results[index][0]:
+            board.push_uci(uci)
+        return board
+
+    def game_pgn(self, index):
+        import chess.pgn
+        game = chess.pgn.Game.from_board(self.game_board(index))
+        white, black = self.players[index % 2], self.players[1 - index % 2]
+        game.headers["White"], game.headers["Black"] = white.get_name(), black.get_name()
+        return str(game)
+
+    def record_stats(self, game, player, stats_path):
+        if player.last_search_stats is None:
+            return
+        row = dict(player.last_search_stats.to_dict(), game=game)
+        self.search_stats.append(row)
+        if stats_path is not None:
+            append_jsonl(stats_path, row)
+
+    def next_move(self, player, timeout):
+        if not timeout: # no timeout, bots are trusted to keep their own clock
+            return player.move(self.board.copy())
+        # The timeout is cooperative: the bot searches in this thread with a
+        # deadline it checks as it goes, so no search outlives its move and the
+        # bot can be reused right away. A bot that never checks it, like the
+        # random bots, finishes its move first and then loses on time.
+        start = time.perf_counter()
+        player.deadline = start + timeout
+        try:
+            move = player.move(self.board.copy())
+        except SearchTimeout:
+            raise TimeoutError()
+        finally:
+            player.deadline = None
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError()
+        return move
+
+    def simulate(self, rounds=4, timeout=10, turn_sleep_ms=0, verbose_size=450, verbose=True, stats_path=None):
+        # stats_path: JSONL file that gets one line of search stats per move
         self.results = []
+        self.search_stats = []
         for r in range(rounds):
             self.board.reset()
 
@@ -44,31 +95,30 @@ class ChessSimulator:
 
             while (not self.board.is_game_over()):
                 player = self.players[step % 2]
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(player.move, self.board.copy())
-                    next_move = future.result(timeout=timeout)
-                self.board.push(next_move)
+                self.board.push(self.next_move(player, timeout))
+                self.record_stats(r, player, stats_path)
 
                 if verbose:
-                    self.print_board(SVG(chess.svg.board(board=self.board, size=verbose_size)))
+                    self.print_board(self.board_svg(self.board, verbose_size))
                     print("round ", r)
                 step += 1
                 if (turn_sleep_ms > 0):
                     time.sleep(turn_sleep_ms / 1000)
 
-            last_board = SVG(chess.svg.board(board=self.board, size=verbose_size))
             winner_id = {'1-0': 0, '0-1': 1,'1/2-1/2': 2}[self.board.result()]
             winner = outcomes[winner_id]
-            self.results.append((last_board, winner))
+            self.results.append(([move.uci() for move in self.board.move_stack], winner))
 
-        if verbose: clear_output(wait=True)
+        if verbose:
+            from IPython.display import display, clear_output
+            clear_output(wait=True)
         summary = {self.p1.get_name(): 0, self.p2.get_name(): 0}
-        for (svg, winner) in self.results:
+        for index, (moves, winner) in enumerate(self.results):
             if verbose: print('Game: {} vs {}. Winner: {}'
                     .format(self.players[0].get_name(), self.players[1].get_name(), winner))
             if winner != self.DRAW: summary[winner] += 1.0
             else:
                 summary[self.p1.get_name()] += 0.5
                 summary[self.p2.get_name()] += 0.5
-            if verbose: display(svg)
+            if verbose: display(self.board_svg(self.game_board(index), verbose_size))
         return summary
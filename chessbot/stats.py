@@ -0,0 +1,76 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+
+class SearchStats:
+    # What one move() cost. Bots fill in what their search counts; movegen
+    # and the total time are measured for every bot. nodes falls back to
+    # expanded positions plus leaf evaluations when the search doesn't count them.
+    counters = ('nodes', 'leaf_evals', 'cutoffs', 'tt_hits', 'tt_misses', 'q_nodes', 'tb_probes',
+                'movegen_calls', 'moves_generated', 'movegen_time', 'eval_time',
+                'eval_cache_hits', 'eval_cache_misses', 're_searches')
+
+    def __init__(self, bot=None, ply=0):
+        self.bot = bot
+        self.ply = ply
+        self.move = None
+        self.max_depth = 0
+        self.elapsed = 0.0
+        self.profile = None
+        for name in self.counters:
+            setattr(self, name, 0)
+
+    def add_movegen(self, n_moves, seconds):
+        self.movegen_calls += 1
+        self.moves_generated += n_moves
+        self.movegen_time += seconds
+
+    def add(self, other):
+        # folds in the stats of a search run on our behalf, e.g. by a wrapped bot
+        for name in self.counters:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def get_nodes(self):
+        return self.nodes or self.movegen_calls + self.leaf_evals
+
+    def get_branching_factor(self): # effective: nodes ** (1 / depth)
+        return self.get_nodes() ** (1 / self.max_depth) if self.max_depth else 0.0
+
+    def get_nodes_per_second(self):
+        return self.get_nodes() / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        row = {'bot': self.bot, 'ply': self.ply, 'move': self.move, 'max_depth': self.max_depth,
+               'elapsed': self.elapsed}
+        row.update((name, getattr(self, name)) for name in self.counters)
+        row['nodes'] = self.get_nodes()
+        row['branching_factor'] = self.get_branching_factor()
+        row['nodes_per_second'] = self.get_nodes_per_second()
+        if self.profile is not None:
+            row['profile'] = self.profile
+        return row
+
+def append_jsonl(path, row):
+    with open(path, 'a') as f:
+        f.write(json.dumps(row) + '\n')
+
+def profile_text(profiler, limit=25):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+def save_profile(profiler, directory, name):
+    # the .prof path when a directory is given, the top of the report otherwise
+    if directory is None:
+        return profile_text(profiler)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + '.prof')
+    profiler.dump_stats(path)
+    return path
+
+def run_profiled(function, *args):
+    profiler = cProfile.Profile()
+    return profiler.runcall(function, *args), profiler
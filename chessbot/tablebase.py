@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+import chess.syzygy
+
+class TablebaseProbe:
+    # Syzygy WDL/DTZ probes for positions with at most max_pieces pieces and
+    # no castling rights. Results are cached in an LRU keyed by the Zobrist
+    # hash. WDL is for the side to move: 2 win, 1 win spoilt by the 50-move
+    # rule, 0 draw, -1, -2 loss. None means the table is not available.
+    # The tablebase opens on first use, so a probe can be sent to other processes.
+    def __init__(self, directory, max_pieces=5, cache_size=2 ** 16):
+        self.directory = directory
+        self.max_pieces = max_pieces
+        self.cache_size = cache_size
+        self.tablebase = None
+        self.cache = OrderedDict()
+        self.reset_counters()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['tablebase'] = None
+        state['cache'] = OrderedDict()
+        return state
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+
+    def get_probes(self):
+        return self.probes
+
+    def get_hits(self):
+        return self.hits
+
+    def get_tablebase(self):
+        if self.tablebase is None:
+            self.tablebase = chess.syzygy.open_tablebase(self.directory)
+        return self.tablebase
+
+    def close(self):
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+
+    def applies(self, board):
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def probe(self, board):
+        # (wdl, dtz), either may be None
+        self.probes += 1
+        key = chess.polyglot.zobrist_hash(board)
+        result = self.cache.get(key)
+        if result is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return result
+
+        tablebase = self.get_tablebase()
+        result = (tablebase.get_wdl(board), tablebase.get_dtz(board))
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def wdl(self, board):
+        return self.probe(board)[0] if self.applies(board) else None
+
+    def best_move(self, board):
+        # keeps the best WDL, then for wins prefers resetting the 50-move
+        # counter and the shortest DTZ, and for losses the longest. Without
+        # DTZ tables the moves are ranked by WDL alone.
+        if not self.applies(board):
+            return None
+        children = []
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            wdl, dtz = self.probe(board)
+            board.pop()
+            if wdl is None:
+                return None
+            children.append((move, -wdl, zeroing, dtz))
+
+        with_dtz = all(dtz is not None for _, _, _, dtz in children)
+        best_move, best_key = None, None
+        for move, wdl, zeroing, dtz in children:
+            if not with_dtz:
+                key = (wdl,)
+            elif wdl > 0:
+                key = (wdl, zeroing, -abs(dtz))
+            else:
+                key = (wdl, False, abs(dtz))
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
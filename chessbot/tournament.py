@@ -0,0 +1,140 @@
+import argparse
+import importlib
+import json
+import random
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+
+from .bot import make_bot
+from .simulator import ChessSimulator
+from .stats import append_jsonl
+
+DEFAULT_BOTS = [
+    ('chessbot.bot.ChessBotDumb', ('Dumb',)),
+    ('chessbot.bot.ChessBotLessDumb', ('Passive', {'attack_prob': 0.6})),
+    ('chessbot.bot.ChessBotLessDumb', ('Aggressive', {'attack_prob': 1.0})),
+    ('chessbot.victor.ChessBotVictor', ('Victor', {'depth': 2})),
+]
+
+def play_game(white_spec, black_spec, timeout, seed):
+    # (result, search stats of every move)
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    simulator = ChessSimulator(make_bot(white_spec), make_bot(black_spec), shuffle=False)
+    try:
+        simulator.simulate(rounds=1, timeout=timeout, verbose=False)
+    except TimeoutError: # the side to move ran out of time
+        return ("0-1" if simulator.board.turn else "1-0"), simulator.search_stats
+    return simulator.board.result(), simulator.search_stats
+
+class Tournament:
+    # Round robin where every (pairing, round, colour) game is its own job on
+    # a process pool. Bots are rebuilt in the workers from (class, args) specs.
+    def __init__(self, bot_specs, rounds=2, timeout=10, n_workers=None, seed=0, stats_path=None):
+        self.bot_specs = bot_specs
+        self.names = [make_bot(spec).get_name() for spec in bot_specs]
+        self.short_names = [make_bot(spec).get_short_name() for spec in bot_specs]
+        self.rounds = rounds
+        self.timeout = timeout
+        self.n_workers = n_workers
+        self.seed = seed
+        self.stats_path = stats_path # JSONL of per-move search stats, written as games finish
+        self.reset()
+
+    def reset(self):
+        n = len(self.bot_specs)
+        self.crosstable = [[0.0] * n for _ in range(n)]
+        self.scores = {name: 0.0 for name in self.names}
+        self.games_played = 0
+
+    def games(self):
+        for i in range(len(self.bot_specs)):
+            for j in range(i + 1, len(self.bot_specs)):
+                for r in range(self.rounds):
+                    yield (i, j, r)
+                    yield (j, i, r)
+
+    def record(self, white, black, result):
+        points = {"1-0": (1.0, 0.0), "0-1": (0.0, 1.0), "1/2-1/2": (0.5, 0.5)}[result]
+        for player, opponent, score in ((white, black, points[0]), (black, white, points[1])):
+            self.crosstable[player][opponent] += score
+            self.scores[self.names[player]] += score
+        self.games_played += 1
+
+    def play(self):
+        # yields (white, black, result) as games finish while keeping the tables up to date
+        self.reset()
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = {}
+            for number, (white, black, r) in enumerate(self.games()):
+                future = executor.submit(play_game, self.bot_specs[white], self.bot_specs[black],
+                                         self.timeout, self.seed + number)
+                futures[future] = (number, white, black)
+
+            for future in as_completed(futures):
+                number, white, black = futures[future]
+                result, search_stats = future.result()
+                self.record(white, black, result)
+                if self.stats_path is not None:
+                    for row in search_stats:
+                        append_jsonl(self.stats_path, dict(row, game=number, white=self.names[white],
+                                                           black=self.names[black]))
+                yield (white, black, result)
+
+    def run(self, verbose=True):
+        for white, black, result in self.play():
+            if verbose:
+                print('{} vs {}: {}'.format(self.names[white], self.names[black], result))
+        return self.standings()
+
+    def standings(self):
+        return sorted(self.scores.items(), key=lambda v: -v[1])
+
+    def crosstable_text(self):
+        base_format = "{:>12}" * (len(self.names) + 1)
+        lines = [base_format.format("-", *self.short_names)]
+        for i, name in enumerate(self.short_names):
+            line = [name]
+            for j in range(len(self.names)):
+                line.append('-' if i == j else "{}-{}".format(self.crosstable[i][j], self.crosstable[j][i]))
+            lines.append(base_format.format(*line))
+        return '\n'.join(lines)
+
+def resolve(value):
+    # {"ref": "package.module.Name"} in a bot file stands for that object, e.g. a scorer class
+    if isinstance(value, dict) and set(value) == {'ref'}:
+        module, _, name = value['ref'].rpartition('.')
+        return getattr(importlib.import_module(module), name)
+    if isinstance(value, list):
+        return [resolve(v) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve(v) for k, v in value.items()}
+    return value
+
+def load_bot_specs(path):
+    with open(path) as f:
+        return [(entry['class'], tuple(resolve(entry.get('args', [])))) for entry in json.load(f)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parallel round-robin chessbot tournament")
+    parser.add_argument('--bots', help='JSON list of {"class": ..., "args": [...]} bot specs')
+    parser.add_argument('--rounds', type=int, default=2, help='games per pairing and colour')
+    parser.add_argument('--timeout', type=float, default=10, help='seconds per move')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quiet', action='store_true')
+    parser.add_argument('--stats', help='append per-move search stats to this JSONL file')
+    args = parser.parse_args(argv)
+
+    specs = load_bot_specs(args.bots) if args.bots else DEFAULT_BOTS
+    tournament = Tournament(specs, args.rounds, args.timeout, args.workers, args.seed, args.stats)
+    standings = tournament.run(verbose=not args.quiet)
+
+    print(tournament.crosstable_text())
+    for player, score in standings:
+        print("%s: %s" % (player, score))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import chess.polyglot
+from collections import namedtuple
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+TableEntry = namedtuple('TableEntry', ['key', 'depth', 'bound', 'score', 'move'])
+
+class TranspositionTable:
+    # Two slots per bucket: a depth-preferred one that keeps the deepest search
+    # of a position and an always-replace one that takes everything else.
+    def __init__(self, size=2 ** 16):
+        self.size = size
+        self.clear()
+        self.reset_counters()
+
+    def clear(self):
+        self.deep_slots = [None] * self.size
+        self.recent_slots = [None] * self.size
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def get_hits(self):
+        return self.hits
+
+    def get_misses(self):
+        return self.misses
+
+    def get_collisions(self):
+        return self.collisions
+
+    def key(self, board):
+        return chess.polyglot.zobrist_hash(board)
+
+    def probe(self, key):
+        index = key % self.size
+        deep, recent = self.deep_slots[index], self.recent_slots[index]
+
+        if deep is not None and deep.key == key:
+            self.hits += 1
+            return deep
+        if recent is not None and recent.key == key:
+            self.hits += 1
+            return recent
+
+        self.misses += 1
+        if deep is not None or recent is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = key % self.size
+        entry = TableEntry(key, depth, bound, score, move)
+        deep = self.deep_slots[index]
+
+        if deep is None or deep.key == key or depth >= deep.depth:
+            self.deep_slots[index] = entry
+            recent = self.recent_slots[index]
+            if recent is not None and recent.key == key:
+                self.recent_slots[index] = None
+        else:
+            self.recent_slots[index] = entry
@@ -1,289 +1,257 @@
 import chess
 import random as rnd
+import time
 import timeit
 from math import sqrt, log
-
-from .bot import ChessBot
+from concurrent.futures import ProcessPoolExecutor
+
+from .bot import ChessBot, wall_deadline, local_deadline
+from .ordering import MoveOrderer
+from .quiescence import Quiescence
+from .rollout import RolloutEngine
+from .mcts import SearchTree
+
+# Piece-square tables, read for WHITE as a1=0 .. h8=63. BLACK reads them back to front.
+PAWNS_EVAL = [
+    0,  0,  0,  0,  0,  0,  0,  0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5,  5, 10, 25, 25, 10,  5,  5,
+    0,  0,  0, 20, 20,  0,  0,  0,
+    5, -5,-10,  0,  0,-10, -5,  5,
+    5, 10, 10,-20,-20, 10, 10,  5,
+    0,  0,  0,  0,  0,  0,  0,  0
+]
+
+KNIGHTS_EVAL = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50
+]
+
+BISHOPS_EVAL = [
+    -20,-10,-10,-10,-10,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  5,  5, 10, 10,  5,  5,-10,
+    -10,  0, 10, 10, 10, 10,  0,-10,
+    -10, 10, 10, 10, 10, 10, 10,-10,
+    -10,  5,  0,  0,  0,  0,  5,-10,
+    -20,-10,-10,-10,-10,-10,-10,-20
+]
+
+ROOKS_EVAL = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+     5, 10, 10, 10, 10, 10, 10,  5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+     0,  0,  0,  5,  5,  0,  0,  0
+]
+
+QUEEN_EVAL = [
+    -20,-10,-10, -5, -5,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+     -5,  0,  5,  5,  5,  5,  0, -5,
+      0,  0,  5,  5,  5,  5,  0, -5,
+    -10,  5,  5,  5,  5,  5,  0,-10,
+    -10,  0,  5,  0,  0,  0,  0,-10,
+    -20,-10,-10, -5, -5,-10,-10,-20
+]
+
+KING_EVAL = [
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -20,-30,-30,-40,-40,-30,-30,-20,
+    -10,-20,-20,-20,-20,-20,-20,-10,
+     20, 20,  0,  0,  0,  0, 20, 20,
+     20, 30, 10,  0,  0, 10, 30, 20
+]
+
+KING_END_GAME_EVAL = [
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50
+]
+
+def piece_square_tables():
+    # [piece_type][colour][phase][square], phase 1 is the end game
+    tables = [None] * 7
+    for piece_type, middle, end in ((chess.PAWN, PAWNS_EVAL, PAWNS_EVAL),
+                                    (chess.KNIGHT, KNIGHTS_EVAL, KNIGHTS_EVAL),
+                                    (chess.BISHOP, BISHOPS_EVAL, BISHOPS_EVAL),
+                                    (chess.ROOK, ROOKS_EVAL, ROOKS_EVAL),
+                                    (chess.QUEEN, QUEEN_EVAL, QUEEN_EVAL),
+                                    (chess.KING, KING_EVAL, KING_END_GAME_EVAL)):
+        white = (tuple(middle), tuple(end))
+        black = (tuple(reversed(middle)), tuple(reversed(end)))
+        tables[piece_type] = (black, white)
+    return tuple(tables)
+
+PIECE_SQUARE_TABLES = piece_square_tables()
+
+# a side with fewer pieces of a type than at the root loses its value once
+MATERIAL_VALUES = (0, 100, 300, 300, 500, 900, 0)
 
 class ChessBotVictor(ChessBot):
     def __init__(self, name, opt_dict = None):
         super().__init__(name, opt_dict)
         self.depth = opt_dict['depth']
-        self.start_board = None
+        self.start_material = None
+        self.piece_scores = None
         self.is_white = True
-
-        self.pawns_eval_white = [
-            0,  0,  0,  0,  0,  0,  0,  0,
-            50, 50, 50, 50, 50, 50, 50, 50,
-            10, 10, 20, 30, 30, 20, 10, 10,
-            5,  5, 10, 25, 25, 10,  5,  5,
-            0,  0,  0, 20, 20,  0,  0,  0,
-            5, -5,-10,  0,  0,-10, -5,  5,
-            5, 10, 10,-20,-20, 10, 10,  5,
-            0,  0,  0,  0,  0,  0,  0,  0
-        ]
-
-        self.pawns_eval_black = [i for i in reversed(self.pawns_eval_white)]
-
-        self.knights_eval_white = [
-            -50,-40,-30,-30,-30,-30,-40,-50,
-            -40,-20,  0,  0,  0,  0,-20,-40,
-            -30,  0, 10, 15, 15, 10,  0,-30,
-            -30,  5, 15, 20, 20, 15,  5,-30,
-            -30,  0, 15, 20, 20, 15,  0,-30,
-            -30,  5, 10, 15, 15, 10,  5,-30,
-            -40,-20,  0,  5,  5,  0,-20,-40,
-            -50,-40,-30,-30,-30,-30,-40,-50
-        ]
-
-        self.knights_eval_black = [i for i in reversed(self.knights_eval_white)]
-
-        self.bishops_eval_white = [
-            -20,-10,-10,-10,-10,-10,-10,-20,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,  0,  5, 10, 10,  5,  0,-10,
-            -10,  5,  5, 10, 10,  5,  5,-10,
-            -10,  0, 10, 10, 10, 10,  0,-10,
-            -10, 10, 10, 10, 10, 10, 10,-10,
-            -10,  5,  0,  0,  0,  0,  5,-10,
-            -20,-10,-10,-10,-10,-10,-10,-20
-        ]
-
-        self.bishops_eval_black = [i for i in reversed(self.bishops_eval_white)]
-
-        self.rooks_eval_white = [
-             0,  0,  0,  0,  0,  0,  0,  0,
-             5, 10, 10, 10, 10, 10, 10,  5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-            -5,  0,  0,  0,  0,  0,  0, -5,
-             0,  0,  0,  5,  5,  0,  0,  0
-        ]
-
-        self.rooks_eval_black = [i for i in reversed(self.rooks_eval_white)]
-
-        self.queen_eval_white = [
-            -20,-10,-10, -5, -5,-10,-10,-20,
-            -10,  0,  0,  0,  0,  0,  0,-10,
-            -10,  0,  5,  5,  5,  5,  0,-10,
-             -5,  0,  5,  5,  5,  5,  0, -5,
-              0,  0,  5,  5,  5,  5,  0, -5,
-            -10,  5,  5,  5,  5,  5,  0,-10,
-            -10,  0,  5,  0,  0,  0,  0,-10,
-            -20,-10,-10, -5, -5,-10,-10,-20
-        ]
-        
-        self.queen_eval_black = [i for i in reversed(self.queen_eval_white)]
-
-        self.king_eval_white = [
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -30,-40,-40,-50,-50,-40,-40,-30,
-            -20,-30,-30,-40,-40,-30,-30,-20,
-            -10,-20,-20,-20,-20,-20,-20,-10,
-             20, 20,  0,  0,  0,  0, 20, 20,
-             20, 30, 10,  0,  0, 10, 30, 20
-        ]
-
-        self.king_eval_black = [i for i in reversed(self.king_eval_white)]
-
-        self.king_end_game_eval_white = [
-            -50,-40,-30,-20,-20,-30,-40,-50,
-            -30,-20,-10,  0,  0,-10,-20,-30,
-            -30,-10, 20, 30, 30, 20,-10,-30,
-            -30,-10, 30, 40, 40, 30,-10,-30,
-            -30,-10, 30, 40, 40, 30,-10,-30,
-            -30,-10, 20, 30, 30, 20,-10,-30,
-            -30,-30,  0,  0,  0,  0,-30,-30,
-            -50,-30,-30,-30,-30,-30,-30,-50
-        ]
-
-        self.king_end_game_eval_black = [i for i in reversed(self.king_end_game_eval_white)]
+        self.nodes = 0
+        self.evaluations = 0
+        self.evaluation_time = 0.0
+        self.orderer = MoveOrderer() if opt_dict.get('move_ordering', True) else None
+        q_depth = opt_dict.get('q_depth', 0)
+        self.quiescence = Quiescence(self.white_score, q_depth, 100, check_time=self.check_time) if q_depth else None
+        # pvs: null windows after the first move, searched again when they fail high.
+        # aspiration: deepen the root one ply at a time, each search in a window
+        # this wide around the last score
+        self.pvs = opt_dict.get('pvs', True)
+        self.aspiration = opt_dict.get('aspiration', 0)
+        self.re_searches = 0
 
     def is_end_game(self, board):
-        n_pawns = len(board.pieces(chess.PAWN, True)) + len(board.pieces(chess.PAWN, False))
-        n_knights = len(board.pieces(chess.KNIGHT, True)) + len(board.pieces(chess.KNIGHT, False))
-        n_bishops = len(board.pieces(chess.BISHOP, True)) + len(board.pieces(chess.BISHOP, False))
-        n_rooks = len(board.pieces(chess.ROOK, True)) + len(board.pieces(chess.ROOK, False))
-        n_queens = len(board.pieces(chess.QUEEN, True)) + len(board.pieces(chess.QUEEN, False))
-        n_kings = len(board.pieces(chess.KING, True)) + len(board.pieces(chess.KING, False))
-
-        if n_pawns + n_knights + n_bishops + n_rooks + n_queens + n_kings <= 22:
-            return True
-        else:
-            return False
+        return chess.popcount(board.occupied) <= 22
 
-    def calc_heuristic_score(self, board, depth):
-        score = 0
+    def count_material(self, board):
+        return [(0, 0)] + [(chess.popcount(board.pieces_mask(piece_type, chess.BLACK)),
+                            chess.popcount(board.pieces_mask(piece_type, chess.WHITE)))
+                           for piece_type in chess.PIECE_TYPES]
 
-        for i in range(8*8):
-            piece = board.piece_at(i)
-            if not piece:
-                continue
-
-            if piece.color == self.is_white:
-                if piece.piece_type == chess.PAWN:
-                    if self.is_white:
-                        score += self.pawns_eval_white[i]
-                    else:
-                        score += self.pawns_eval_black[i]                    
-
-                elif piece.piece_type == chess.KNIGHT:
-                    if self.is_white:
-                        score += self.knights_eval_white[i]
-                    else:
-                        score += self.knights_eval_black[i]                    
-
-                elif piece.piece_type == chess.BISHOP:
-                    if self.is_white:
-                        score += self.bishops_eval_white[i]
-                    else:
-                        score += self.bishops_eval_black[i]                    
-
-                elif piece.piece_type == chess.ROOK:
-                    if self.is_white:
-                        score += self.rooks_eval_white[i]
-                    else:
-                        score += self.rooks_eval_black[i]                    
-
-                elif piece.piece_type == chess.QUEEN:
-                    if self.is_white:
-                        score += self.queen_eval_white[i]
-                    else:
-                        score += self.queen_eval_black[i]                    
-
-                elif piece.piece_type == chess.KING and self.is_end_game(board):
-                    if self.is_white:
-                        score += self.king_end_game_eval_white[i]
-                    else:
-                        score += self.king_end_game_eval_black[i]                    
-
-                elif piece.piece_type == chess.KING:
-                    if self.is_white:
-                        score += self.king_eval_white[i]
-                    else:
-                        score += self.king_eval_black[i]
+    def piece_score(self, piece_type, white, black, phase):
+        # bot's side score of one piece type: its squares plus the root material it lost
+        black_tables, white_tables = PIECE_SQUARE_TABLES[piece_type]
+        score = 0
+        table = white_tables[phase]
+        for square in chess.scan_forward(white):
+            score += table[square]
+        table = black_tables[phase]
+        for square in chess.scan_forward(black):
+            score -= table[square]
+
+        own, other = (white, black) if self.is_white else (black, white)
+        start_black, start_white = self.start_material[piece_type]
+        start_own, start_other = (start_white, start_black) if self.is_white else (start_black, start_white)
+        value = MATERIAL_VALUES[piece_type]
+        if not self.is_white:
+            score = -score
+        if start_other > chess.popcount(other):
+            score += value
+        if start_own > chess.popcount(own):
+            score -= value
+        return score
 
-                else:
-                    pass
+    def calc_heuristic_score(self, board, depth):
+        # each piece type only changes when a move touches it, so its part of
+        # the score is cached per search by its masks
+        phase = 1 if chess.popcount(board.occupied) <= 22 else 0
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        score = 0
 
-            else:
-                if piece.piece_type == chess.PAWN:
-                    if not self.is_white:
-                        score -= self.pawns_eval_white[i]
-                    else:
-                        score -= self.pawns_eval_black[i]                    
-
-                elif piece.piece_type == chess.KNIGHT:
-                    if not self.is_white:
-                        score -= self.knights_eval_white[i]
-                    else:
-                        score -= self.knights_eval_black[i]                    
-
-                elif piece.piece_type == chess.BISHOP:
-                    if not self.is_white:
-                        score -= self.bishops_eval_white[i]
-                    else:
-                        score -= self.bishops_eval_black[i]                    
-
-                elif piece.piece_type == chess.ROOK:
-                    if not self.is_white:
-                        score -= self.rooks_eval_white[i]
-                    else:
-                        score -= self.rooks_eval_black[i]                    
-
-                elif piece.piece_type == chess.QUEEN:
-                    if not self.is_white:
-                        score -= self.queen_eval_white[i]
-                    else:
-                        score -= self.queen_eval_black[i]                    
-
-                elif piece.piece_type == chess.KING and self.is_end_game(board):
-                    if not self.is_white:
-                        score -= self.king_end_game_eval_white[i]
-                    else:
-                        score -= self.king_end_game_eval_black[i]                    
-
-                elif piece.piece_type == chess.KING:
-                    if not self.is_white:
-                        score -= self.king_eval_white[i]
-                    else:
-                        score -= self.king_eval_black[i]
+        for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                 (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                 (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            cache = self.piece_scores[piece_type]
+            key = (mask & white, mask & black, phase)
+            part = cache.get(key)
+            if part is None:
+                part = cache[key] = self.piece_score(piece_type, key[0], key[1], phase)
+            score += part
 
-                else:
-                    pass
-
-        # Opponent looses King
-        if board.is_checkmate() and (not self.is_white == board.turn):
-            score += 9000
-
-        # Bot looses King
-        if board.is_checkmate() and (self.is_white == board.turn):
-            score += -9000
-
-        # Opponent looses Queen
-        if len(self.start_board.pieces(chess.QUEEN, (not self.is_white))) > len(board.pieces(chess.QUEEN, (not self.is_white))):
-            score += 900
-        
-        # Bot looses Queen        
-        if len(self.start_board.pieces(chess.QUEEN, self.is_white)) > len(board.pieces(chess.QUEEN, self.is_white)):
-            score += -900
-
-        # Opponent looses Rook
-        if len(self.start_board.pieces(chess.ROOK, (not self.is_white))) > len(board.pieces(chess.ROOK, (not self.is_white))):
-            score += 500
-        
-        # Bot looses Rook        
-        if len(self.start_board.pieces(chess.ROOK, self.is_white)) > len(board.pieces(chess.ROOK, self.is_white)):
-            score += -500
-
-        # Opponent looses Bishop      
-        if len(self.start_board.pieces(chess.BISHOP, (not self.is_white))) > len(board.pieces(chess.BISHOP, (not self.is_white))):
-            score += 300
-        
-        # Bot looses Bishop        
-        if len(self.start_board.pieces(chess.BISHOP, self.is_white)) > len(board.pieces(chess.BISHOP, self.is_white)):
-            score += -300
-        
-        # Opponent looses Knight        
-        if len(self.start_board.pieces(chess.KNIGHT, (not self.is_white))) > len(board.pieces(chess.KNIGHT, (not self.is_white))):
-            score += 300
-        
-        # Bot looses Knight        
-        if len(self.start_board.pieces(chess.KNIGHT, self.is_white)) > len(board.pieces(chess.KNIGHT, self.is_white)):
-            score += -300
-
-        # Opponent looses Pawn    
-        if len(self.start_board.pieces(chess.PAWN, (not self.is_white))) > len(board.pieces(chess.PAWN, (not self.is_white))):
-            score += 100
-        
-        # Bot looses Pawn        
-        if len(self.start_board.pieces(chess.PAWN, self.is_white)) > len(board.pieces(chess.PAWN, self.is_white)):
-            score += -100
+        if board.is_check() and board.is_checkmate():
+            score += 9000 if board.turn != self.is_white else -9000
 
         # Makes AI smarter with weighting depth (number of moves)
         score += (depth-1) * 100
         return score
 
+    def evaluate(self, board, depth): # calc_heuristic_score, counted in the search stats
+        self.evaluations += 1
+        start = time.perf_counter()
+        score = self.calc_heuristic_score(board, depth)
+        self.evaluation_time += time.perf_counter() - start
+        return score
+
+    def white_score(self, board): # quiescence's stand pat
+        score = self.evaluate(board, 1)
+        return score if self.is_white else -score
+
+    def leaf_score(self, board, alpha, beta): # from the bot's side, like calc_heuristic_score
+        if board.turn == self.is_white:
+            return self.quiescence.search(board, alpha, beta)
+        return -self.quiescence.search(board, -beta, -alpha)
+
+    def ordered_moves(self, board):
+        moves = self.possible_moves(board)
+        if self.orderer is not None:
+            moves = self.orderer.order(board, moves, len(board.move_stack))
+        return moves
+
+    def record_cutoff(self, board, move, depth, index):
+        if self.orderer is not None:
+            self.orderer.record_cutoff(board, move, len(board.move_stack), depth, index)
+
+    def new_search(self, board):
+        self.is_white = board.turn
+        self.start_material = self.count_material(board)
+        self.piece_scores = [{} for _ in range(7)]
+        self.nodes = 0
+        self.evaluations = 0
+        self.evaluation_time = 0.0
+        self.re_searches = 0
+        if self.orderer is not None:
+            self.orderer.reset_counters()
+            self.orderer.age_history()
+        if self.quiescence is not None:
+            self.quiescence.reset_counters()
+
+    def collect_stats(self, stats):
+        q_nodes = self.quiescence.get_nodes() if self.quiescence is not None else 0
+        stats.nodes += self.nodes + q_nodes
+        stats.q_nodes += q_nodes
+        stats.leaf_evals += self.evaluations
+        stats.eval_time += self.evaluation_time
+        stats.cutoffs += self.orderer.get_cutoffs() if self.orderer is not None else 0
+        stats.re_searches += self.re_searches
+        stats.max_depth = self.depth
+
     def minimax(self, board, depth, alpha, beta):
+        self.nodes += 1
+        self.check_time()
+        if depth == 1 and self.quiescence is not None and not board.is_game_over():
+            return self.leaf_score(board, alpha, beta)
         if depth == 1 or board.is_game_over():
-            return self.calc_heuristic_score(board, depth)
+            return self.evaluate(board, depth)
 
         elif board.turn == self.is_white:
             v = -10**6
 
-            for a in self.possible_moves(board):
-                board_copy = board.copy()
-                board_copy.push(a)
-
-                v = max(v, self.minimax(board_copy, depth-1, alpha, beta))
+            for index, a in enumerate(self.ordered_moves(board)):
+                board.push(a)
+                v = max(v, self.child_score(board, depth-1, alpha, beta, index == 0, True))
+                board.pop()
                 alpha = max(alpha, v)
 
                 if alpha >= beta:
-                    # print("prune")
+                    self.record_cutoff(board, a, depth, index)
                     break
 
             return v
@@ -291,35 +259,84 @@ class ChessBotVictor(ChessBot):
         else:
             v = 10**6
 
-            for a in self.possible_moves(board):
-                board_copy = board.copy()
-                board_copy.push(a)
-
-                v = min(v, self.minimax(board_copy, depth-1, alpha, beta))
+            for index, a in enumerate(self.ordered_moves(board)):
+                board.push(a)
+                v = min(v, self.child_score(board, depth-1, alpha, beta, index == 0, False))
+                board.pop()
                 beta = min(beta, v)
 
                 if alpha >= beta:
-                    # print("prune")                    
+                    self.record_cutoff(board, a, depth, index)
                     break
 
             return v
 
-    def move(self, board):
-        self.is_white = board.turn
-        self.start_board = board.copy()
+    def child_score(self, board, depth, alpha, beta, first, maximizing):
+        if first or not self.pvs or beta - alpha <= 1:
+            return self.minimax(board, depth, alpha, beta)
+        if maximizing:
+            score = self.minimax(board, depth, alpha, alpha + 1)
+        else:
+            score = self.minimax(board, depth, beta - 1, beta)
+        if alpha < score < beta: # a bound on the far side of the null window
+            self.re_searches += 1
+            score = self.minimax(board, depth, score, beta) if maximizing else self.minimax(board, depth, alpha, score)
+        return score
+
+    def prepare_search(self, board):
+        self.new_search(board)
+
+    def score_root_move(self, board, move, alpha=None):
+        board.push(move)
+        score = self.minimax(board, self.depth, -10**6 if alpha is None else alpha, 10**6)
+        board.pop()
+        return score
+
+    def root_search(self, board, moves, depth, alpha, beta):
         best_score = -10**6
-        current_score = 0
         best_move = None
 
-        for move in self.possible_moves(board):
-            board_copy = board.copy()
-            board_copy.push(move)
-            current_score = self.minimax(board_copy, self.depth, -10**6, 10**6)
+        # the search plays on the given board and takes every move back
+        for index, move in enumerate(moves):
+            board.push(move)
+            current_score = self.child_score(board, depth, max(alpha, best_score), beta, index == 0, True)
+            board.pop()
 
             if current_score > best_score:
                 best_score = current_score
                 best_move = move
+                if best_score >= beta:
+                    break
 
+        return best_score, best_move
+
+    def aspiration_search(self, board, moves, depth, guess):
+        window = self.aspiration
+        alpha, beta = guess - window, guess + window
+        while True:
+            score, move = self.root_search(board, moves, depth, alpha, beta)
+            if alpha > -10**6 and score <= alpha:
+                window *= 4
+                alpha = max(guess - window, -10**6)
+            elif beta < 10**6 and score >= beta:
+                window *= 4
+                beta = min(guess + window, 10**6)
+            else:
+                return score, move
+            self.re_searches += 1
+
+    def move(self, board):
+        self.new_search(board)
+        moves = self.possible_moves(board)
+        if not self.aspiration or not moves:
+            return self.root_search(board, moves, self.depth, -10**6, 10**6)[1]
+
+        score, best_move = self.root_search(board, moves, 1, -10**6, 10**6)
+        for depth in range(2, self.depth + 1):
+            # the last best move is searched first, with the full window
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            score, best_move = self.aspiration_search(board, moves, depth, score)
         return best_move
 
 
@@ -327,115 +344,230 @@ class ChessBotVictor(ChessBot):
 # Chess Bot using Monte Carlo Tree Search #
 # # # # # # # # # # # # # # # # # # # # # #
 
+def root_search_stats(opt_dict, fen, seed, deadline=None):
+    # one independent tree per worker, only the root children are sent back
+    rnd.seed(seed)
+    bot = ChessBotMonteCarlo("worker", dict(opt_dict, n_workers=1))
+    bot.deadline = local_deadline(deadline)
+    board = chess.Board(fen)
+    bot.is_white = board.turn
+    bot.tree = SearchTree()
+    bot.monte_carlo_tree_search(board)
+    children = [(bot.tree.moves[c], bot.tree.visits[c], bot.tree.wins[c]) for c in bot.tree.children(0)]
+    return children, (len(bot.tree), bot.rollout.get_playouts(), bot.rollout.elapsed)
+
+def rollout_points(fen, n_simulations, max_plies, seed):
+    # (WHITE's points, (nodes, playouts, rollout time)) like root_search_stats
+    rnd.seed(seed)
+    board = chess.Board(fen)
+    rollout = RolloutEngine(max_plies)
+    points = sum(rollout.playout(board) + 1 for _ in range(n_simulations)) / 2
+    return points, (0, rollout.get_playouts(), rollout.elapsed)
+
 class ChessBotMonteCarlo(ChessBot):
     def __init__(self, name, opt_dict = None):
         super().__init__(name, opt_dict)
         self.n_simulations = opt_dict["n_simulations"]
         self.n_interations = opt_dict["n_iterations"]
+        self.exploration = opt_dict.get("exploration", 2)
         self.is_white = True
-
-    class Node:
-        def __init__(self, n_wins, n_simulations, board, parent, children):
-            self.n_wins = n_wins
-            self.n_simulations = n_simulations
-            self.board = board
-            self.parent = parent
-            self.children = children
-
-        def add_child(self, node):
-            node.parent = self
-            self.children.append(node)
+        self.max_playout_plies = opt_dict.get("max_playout_plies", 200)
+        self.rollout = RolloutEngine(self.max_playout_plies)
+
+        # parallel search: "root" runs independent trees and merges their root
+        # statistics, "leaf" sends several playouts at once to the pool
+        self.opt_dict = dict(opt_dict)
+        self.n_workers = opt_dict.get("n_workers", 1)
+        self.mode = opt_dict.get("mode", "root")
+        self.seed = opt_dict.get("seed", 0)
+        self.executor = None
+
+        # kept between moves so the subtree after our move and the reply carries over
+        self.tree = None
+        self.root_board = None
+        self.last_move = None
+        # what the workers searched for the current move: nodes, playouts, rollout time
+        self.worker_counts = [0, 0, 0.0]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
 
     def get_uct(self, node, c=2):
-        return (node.n_wins / node.n_simulations) + sqrt(c*log(node.parent.n_simulations)/node.n_simulations)
+        tree = self.tree
+        return (tree.wins[node] / tree.visits[node]) + \
+            sqrt(c*log(tree.visits[tree.parents[node]])/tree.visits[node])
 
-    def pick_best_child(self, root):
+    def pick_best_child(self, node):
         best_uct = -10**6
-        current_uct = 0
         best_child = None
 
-        for child in root.children:
-            current_uct = self.get_uct(child)
+        for child in self.tree.children(node):
+            if self.tree.visits[child] == 0:
+                return child
+            current_uct = self.get_uct(child, self.exploration)
             if current_uct > best_uct:
                 best_uct = current_uct
                 best_child = child
 
         return best_child
 
-    def simulate(self, node):
-        n_wins = 0
-  
-        for _ in range(self.n_simulations):
-            board_copy = node.board.copy()
-
-            # print("Random Playout start...")
-            while board_copy.result() == '*':
-                moves = self.possible_moves(board_copy)
-                board_copy.push(moves[rnd.randint(0, len(moves)-1)])
-            # print("Random Playout ended.")            
-
-            if (board_copy.result() == "1-0" and self.is_white) or (board_copy.result() == "0-1" and not self.is_white):
-                n_wins += 1
-            else:
-                pass
-
-        return self.Node(n_wins, self.n_simulations, node.board.copy(), None, [])
-
-    def backpropagate(self, node):
-        for child in node.children:
-            node.n_wins += child.n_wins
-            node.n_simulations += child.n_simulations
-
-        while node.parent != None:
-            node.parent.n_wins += node.n_wins
-            node.parent.n_simulations += node.n_simulations
-
-            node = node.parent
-
-        return node
-
-    def monte_carlo_tree_search(self, root):
+    def simulate(self, board):
+        # WHITE's points out of n_simulations, a draw counting half
+        if board.is_game_over():
+            result = {"1-0": 1, "1/2-1/2": 0, "0-1": -1}[board.result()]
+            return self.n_simulations * (result + 1) / 2
+        return sum(self.rollout.playout(board) + 1 for _ in range(self.n_simulations)) / 2
+
+    def backpropagate(self, node, mover, white_points):
+        tree = self.tree
+        while node != -1:
+            tree.visits[node] += self.n_simulations
+            tree.wins[node] += white_points if mover == chess.WHITE else self.n_simulations - white_points
+            mover = not mover
+            node = tree.parents[node]
+
+    def select_leaf(self, board):
+        # Selection and expansion, replaying the moves on the root board
+        tree = self.tree
+        node = 0
+        plies = 0
+        while tree.is_expanded(node) and tree.child_count[node] > 0:
+            node = self.pick_best_child(node)
+            board.push(tree.move(node))
+            plies += 1
+
+        if not tree.is_expanded(node):
+            tree.expand(node, [] if board.is_game_over() else self.possible_moves(board))
+            if tree.child_count[node] > 0:
+                node = tree.first_child[node]
+                board.push(tree.move(node))
+                plies += 1
+        return node, plies
+
+    def monte_carlo_tree_search(self, board):
         for _ in range(self.n_interations):
-            # print("Wins: " + str(root.n_wins))
-            # print("Simulations: " + str(root.n_simulations))            
-
-            # Selection
-            node = root
-            while len(node.children) > 0:
-                node = self.pick_best_child(node)
-
-            if len(self.possible_moves(node.board)) == 0:
-                break
-
-            # Expansion
-            expanded_nodes = []
-            moves = self.possible_moves(node.board)
-            for _ in range(len(moves)//2):
-                board_copy = node.board.copy()            
-                board_copy.push(moves[rnd.randint(0, len(moves)-1)])
-                expanded_nodes.append(self.Node(0, 0, board_copy, None, []))
-            
-            # Simulation
-            for expanded_node in expanded_nodes:
-                node.add_child(self.simulate(expanded_node))
-
-            # Backpropagation
-            root = self.backpropagate(node)          
-
-        return root
+            self.check_time()
+            node, plies = self.select_leaf(board)
+
+            # Simulation and backpropagation
+            self.backpropagate(node, not board.turn, self.simulate(board))
+
+            for _ in range(plies):
+                board.pop()
+
+    def add_virtual_loss(self, node, delta):
+        # visits without wins make the path look lost for every player on it
+        while node != -1:
+            self.tree.visits[node] += delta
+            node = self.tree.parents[node]
+
+    def leaf_parallel_search(self, board):
+        executor = self.get_executor()
+        done = 0
+        while done < self.n_interations:
+            self.check_time()
+            batch = []
+            for _ in range(min(self.n_workers, self.n_interations - done)):
+                node, plies = self.select_leaf(board)
+                mover = not board.turn
+                if board.is_game_over():
+                    batch.append((node, mover, self.simulate(board), None))
+                else:
+                    seed = "{}:{}:{}".format(self.seed, len(self.tree), done + len(batch))
+                    future = executor.submit(rollout_points, board.fen(), self.n_simulations, self.max_playout_plies, seed)
+                    batch.append((node, mover, None, future))
+                self.add_virtual_loss(node, self.n_simulations)
+                for _ in range(plies):
+                    board.pop()
+
+            for node, mover, points, future in batch:
+                self.add_virtual_loss(node, -self.n_simulations)
+                if future is not None:
+                    points, counts = future.result()
+                    self.add_worker_counts(counts)
+                self.backpropagate(node, mover, points)
+            done += len(batch)
+
+    def root_parallel_search(self, board):
+        executor = self.get_executor()
+        fen = board.fen()
+        deadline = wall_deadline(self.deadline)
+        futures = [executor.submit(root_search_stats, self.opt_dict, fen, "{}:{}:{}".format(self.seed, fen, worker),
+                                   deadline)
+                   for worker in range(self.n_workers)]
+
+        merged = {}
+        for future in futures:
+            children, counts = future.result()
+            self.add_worker_counts(counts)
+            for move_code, visits, wins in children:
+                total = merged.setdefault(move_code, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+
+        self.tree = SearchTree()
+        for move_code, (visits, wins) in merged.items():
+            self.tree.add(move_code, 0, visits, wins)
+            self.tree.visits[0] += visits
+        self.tree.first_child[0] = 1
+        self.tree.child_count[0] = len(merged)
+
+    def reuse_tree(self, board):
+        if self.tree is None or len(board.move_stack) < 2 or board.move_stack[-2] != self.last_move:
+            return None
+        expected = self.root_board.copy(stack=False)
+        expected.push(self.last_move)
+        expected.push(board.move_stack[-1])
+        if expected.fen() != board.fen():
+            return None
+
+        node = self.tree.child_for(0, self.last_move)
+        if node is not None:
+            node = self.tree.child_for(node, board.move_stack[-1])
+        return self.tree.subtree(node) if node is not None else None
+
+    def add_worker_counts(self, counts):
+        for i, count in enumerate(counts):
+            self.worker_counts[i] += count
+
+    def collect_stats(self, stats):
+        # a root-parallel tree only holds the merged root, the workers' trees are what was searched
+        nodes, playouts, elapsed = self.worker_counts
+        stats.nodes += nodes if self.n_workers > 1 and self.mode != "leaf" else len(self.tree)
+        stats.leaf_evals += self.rollout.get_playouts() + playouts
+        stats.eval_time += self.rollout.elapsed + elapsed
 
     def move(self, board):
         self.is_white = board.turn
-        root = self.monte_carlo_tree_search(self.Node(0, 0, board, None, []))
-        
-        best_stat = -10^6
-        current_state = 0
-        best_node = None
+        self.rollout.reset_counters()
+        self.worker_counts = [0, 0, 0.0]
+        self.tree = self.reuse_tree(board) or SearchTree()
+        if self.n_workers <= 1:
+            self.monte_carlo_tree_search(board)
+        elif self.mode == "leaf":
+            self.leaf_parallel_search(board)
+        else:
+            self.root_parallel_search(board)
 
-        for node in root.children:
-            current_state = node.n_wins / node.n_simulations
-            if current_state > best_stat:
-                best_stat = current_state
+        best_visits = -1
+        best_node = None
+        for node in self.tree.children(0):
+            if self.tree.visits[node] > best_visits:
+                best_visits = self.tree.visits[node]
                 best_node = node
 
-        return best_node.board.pop()
+        self.root_board = board.copy(stack=False)
+        self.last_move = self.tree.move(best_node) if best_node is not None else None
+        return self.last_move